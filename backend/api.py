@@ -1,11 +1,18 @@
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Header# Import FastAPI framework components for building the API, handling file uploads, form data, exceptions, dependency injection, and reading HTTP headers
 from fastapi.middleware.cors import CORSMiddleware# Import middleware for handling Cross-Origin Resource Sharing (CORS)
 from fastapi.staticfiles import StaticFiles# Import static file serving capabilities
+from fastapi.concurrency import run_in_threadpool# Run blocking file I/O without stalling the event loop
 from pydantic import BaseModel, Field# Import Pydantic for data validation and structured data models
 from typing import Dict, List, Optional# Import typing utilities for type hints
 import os# Import standard library modules for file system operations
+import json
+from collections import OrderedDict
 import sys
 import tempfile
+import shutil
+import threading
+import asyncio
+from contextlib import asynccontextmanager
 import sqlite3# Import SQLite library for local database interactions
 from datetime import datetime, timedelta# Import datetime utilities for handling dates and times
 
@@ -16,11 +23,22 @@ from passlib.context import CryptContext# Import password hashing and verificati
 backend_dir = os.path.dirname(os.path.abspath(__file__))# Determine backend directory path based on this file’s location
 sys.path.append(backend_dir)# Add backend directory to Python’s search path so local imports work
 
-from quiz_app import QuizApp, openai_api_key# Import main application logic (QuizApp) and API key from node_funcs module
+from task_manager import get_conn, get_transaction, setup_database, ROADMAP_CONNECTIONS# Shared SQLite connection pool (WAL, pragmas applied once per connection) and the schema
 
 
-# Instantiate core app and services
-quiz_app = QuizApp(api_key=openai_api_key)# Create an instance of QuizApp with the provided API key
+# Core app and services; QuizApp pulls in LangGraph/OpenAI, so it is imported and built on first use
+_quiz_app = None
+_quiz_app_lock = threading.Lock()
+
+
+def get_quiz_app():# Return the shared QuizApp, creating it on the first call
+    global _quiz_app
+    if _quiz_app is None:
+        with _quiz_app_lock:
+            if _quiz_app is None:
+                from quiz_app import QuizApp, openai_api_key# Import main application logic (QuizApp) and API key
+                _quiz_app = QuizApp(api_key=openai_api_key)# Create an instance of QuizApp with the provided API key
+    return _quiz_app
 
 app = FastAPI(title="PLP API", version="1.0.0")# Create the FastAPI application with metadata
 # -------------------- AUTH SETUP --------------------
@@ -50,16 +68,44 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGO)# Encode and return the JWT token
 
 
-def get_db_connection():# Open a new SQLite database connection to user_learning.db
-    return sqlite3.connect("user_learning.db")
+# Latest quiz result for a user name. One fixed SQL text, so each pooled connection's statement cache
+# parses it once; idx_users_name (name, implicitly followed by the rowid id) serves both the WHERE and the ORDER BY
+SQL_SELECT_LATEST_RESULT = "SELECT score, level, roadmap, id FROM users WHERE name = ? ORDER BY id DESC LIMIT 1"
+
+
+# users.id -> parsed roadmap, most recently used last. users rows are only ever inserted or deleted (AUTOINCREMENT
+# ids are never reused), so the id alone pins one roadmap and a hit never has to hash or compare the stored text
+PARSED_ROADMAP_CACHE_SIZE = 512
+_PARSED_ROADMAPS = OrderedDict()
+_PARSED_ROADMAPS_LOCK = threading.Lock()
+
+
+def _parse_roadmap(row_id: int, roadmap_str: Optional[str]) -> tuple:# Decode a stored roadmap once per quiz result row
+    with _PARSED_ROADMAPS_LOCK:
+        cached = _PARSED_ROADMAPS.get(row_id)
+        if cached is not None:
+            _PARSED_ROADMAPS.move_to_end(row_id) # Mark as recently used
+            return cached
+    try:
+        parsed = tuple(json.loads(roadmap_str)) if roadmap_str else ()# If roadmap exists, parse it from JSON string; a tuple, so the cached value can't be modified by a caller
+    except (ValueError, TypeError):
+        parsed = ()# If parsing fails, use an empty roadmap
+    with _PARSED_ROADMAPS_LOCK:
+        _PARSED_ROADMAPS[row_id] = parsed
+        _PARSED_ROADMAPS.move_to_end(row_id)
+        if len(_PARSED_ROADMAPS) > PARSED_ROADMAP_CACHE_SIZE:
+            _PARSED_ROADMAPS.popitem(last=False)
+    return parsed
+
+
+def _select_latest_result(user_name: str):# Fetch the last quiz result (score, level, roadmap, id) for a user name, or None
+    with get_conn() as conn: # Borrow a pooled connection to the database storing user learning progress
+        return conn.execute(SQL_SELECT_LATEST_RESULT, (user_name,)).fetchone() # Parameterized to avoid SQL injection
 
 
 def get_user_by_id(user_id: int):# Retrieve user information by their ID from the auth_users table
-    conn = get_db_connection()# Connect to database
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name, email, role FROM auth_users WHERE id = ?", (user_id,))# Query for the user record
-    row = cursor.fetchone()# Fetch the first result row
-    conn.close()# Close database connection
+    with get_conn() as conn:# Borrow a pooled connection (returned to the pool on exit)
+        row = conn.execute("SELECT id, name, email, role FROM auth_users WHERE id = ?", (user_id,)).fetchone()# Query for the user record
     if not row:# Return None if user not found
         return None
     return {"id": row[0], "name": row[1], "email": row[2], "role": row[3]}# Return user details as a dictionary
@@ -95,29 +141,33 @@ def get_optional_user(authorization: Optional[str] = Header(None)): # Attempt to
 
 @app.on_event("startup") # Register a function to run when the FastAPI app starts
 def seed_admin():
-    """Ensure at least one admin exists; if none, create a default admin."""
-    conn = get_db_connection()# Open database connection
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS auth_users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT NOT NULL UNIQUE,
-            password_hash TEXT NOT NULL,
-            role TEXT NOT NULL CHECK(role IN ('user','admin')) DEFAULT 'user',
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-    """)# Create the auth_users table if it does not exist
-    cursor.execute("SELECT COUNT(*) FROM auth_users WHERE role='admin'")# Count how many admins currently exist
-    count_admin = cursor.fetchone()[0]
-    if count_admin == 0:# If no admin exists, create a default admin user
-        # Create default admin user
-        cursor.execute(
-            "INSERT OR IGNORE INTO auth_users (name, email, password_hash, role) VALUES (?, ?, ?, 'admin')",
-            ("Admin", "admin@plp.local", hash_password(os.getenv("DEFAULT_ADMIN_PASSWORD", "Admin123!"))),
-        )# Insert a default admin with name, email, and hashed password
-        conn.commit()
-    conn.close()
+    """Create the schema, then ensure at least one admin exists; if none, create a default admin."""
+    # Every table, synchronously and independent of the lazily built QuizApp, so the summary and auth
+    # endpoints can query users/tasks on a fresh database before the warm-up has finished
+    setup_database()
+    with get_conn() as conn:# Borrow a pooled connection (autocommit)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM auth_users WHERE role='admin'")# Count how many admins currently exist
+        count_admin = cursor.fetchone()[0]
+        if count_admin == 0:# If no admin exists, create a default admin user
+            # Create default admin user
+            cursor.execute(
+                "INSERT OR IGNORE INTO auth_users (name, email, password_hash, role) VALUES (?, ?, ?, 'admin')",
+                ("Admin", "admin@plp.local", hash_password(os.getenv("DEFAULT_ADMIN_PASSWORD", "Admin123!"))),
+            )# Insert a default admin with name, email, and hashed password
+
+
+@app.on_event("startup")
+def warm_quiz_app():
+    """Build the QuizApp in the background so the port opens without waiting on the imports."""
+    threading.Thread(target=get_quiz_app, name="quiz-app-warmup", daemon=True).start()
+
+
+@app.on_event("shutdown") # Register a function to run when the FastAPI app stops
+def stop_background_workers():
+    """Flush queued emails and close the shared SMTP session and worker threads."""
+    if _quiz_app is not None: # Nothing to stop if the app was never built
+        _quiz_app.task_manager.shutdown()
 
 
 class RegisterRequest(BaseModel):# Pydantic model for registration requests
@@ -147,29 +197,28 @@ def register(payload: RegisterRequest, requester: Optional[dict] = Depends(get_o
         desired_role = payload.role if payload.role in ("user", "admin") else "user"
 
     # If no admin exists yet, allow first registered to be admin
-    conn = get_db_connection()# Connect to database to check if an admin exists
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM auth_users WHERE role='admin'")
-    has_admin = cursor.fetchone()[0] > 0
-    if not has_admin:# If no admin exists yet, make this first registered user an admin
-        desired_role = "admin"
-
-    # Insert user
+    password_hash = hash_password(payload.password) # Hash before taking the write lock; it is deliberately slow
+    # Check for an admin and insert in one write transaction, so two first registrations can't both become admin
     try:# Insert the new user into the database
-        cursor.execute(
-            "INSERT INTO auth_users (name, email, password_hash, role) VALUES (?, ?, ?, ?)",
-            (payload.name.strip(), payload.email.strip().lower(), hash_password(payload.password), desired_role),
-        )
-        user_id = cursor.lastrowid# Get the auto-generated user ID of the newly inserted user
-        conn.commit()
+        with get_transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM auth_users WHERE role='admin'")
+            has_admin = cursor.fetchone()[0] > 0
+            if not has_admin:# If no admin exists yet, make this first registered user an admin
+                desired_role = "admin"
+
+            # Insert user
+            cursor.execute(
+                "INSERT INTO auth_users (name, email, password_hash, role) VALUES (?, ?, ?, ?)",
+                (payload.name.strip(), payload.email.strip().lower(), password_hash, desired_role),
+            )
+            user_id = cursor.lastrowid# Get the auto-generated user ID of the newly inserted user
         try:
             print(f"[AUTH] Registered user id={user_id} email={payload.email.strip().lower()} role={desired_role}")
         except Exception:
             pass
-    except sqlite3.IntegrityError:# Email already exists, close connection and return error
-        conn.close()
+    except sqlite3.IntegrityError:# Email already exists (the transaction has been rolled back), return error
         raise HTTPException(status_code=400, detail="Email already registered")
-    conn.close()
 
     token = create_access_token({"sub": str(user_id)})# Generate JWT token for the new user
     return AuthResponse(token=token, name=payload.name.strip(), email=payload.email.strip().lower(), role=desired_role)# Return authentication response
@@ -177,11 +226,8 @@ def register(payload: RegisterRequest, requester: Optional[dict] = Depends(get_o
 
 @app.post("/auth/login", response_model=AuthResponse)# API endpoint for user login
 def login(payload: LoginRequest):
-    conn = get_db_connection()# Connect to database and fetch user by email
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name, email, password_hash, role FROM auth_users WHERE email = ?", (payload.email.strip().lower(),))
-    row = cursor.fetchone()
-    conn.close()
+    with get_conn() as conn:# Borrow a pooled connection and fetch user by email
+        row = conn.execute("SELECT id, name, email, password_hash, role FROM auth_users WHERE email = ?", (payload.email.strip().lower(),)).fetchone()
     if not row: # If no matching user found, reject login
         raise HTTPException(status_code=401, detail="Invalid credentials")
     user_id, name, email, password_hash, role = row # Extract user details
@@ -217,9 +263,50 @@ app.add_middleware(# Add middleware to enable CORS for local React development
 
 # Ensure uploads directory exists and mount it for static serving
 os.makedirs("uploads", exist_ok=True)# Create the "uploads" directory if it doesn't already exist, to store uploaded files
+# Staging dir next to uploads/ (same filesystem, so saving is a rename, not a copy) but outside the
+# /uploads mount, so partial or abandoned uploads are never served
+UPLOAD_TMP_DIR = "uploads_tmp"
+os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+UPLOAD_CHUNK_SIZE = 1024 * 1024 # Stream uploads to disk in 1 MiB chunks instead of reading them into memory
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")# Mount the "uploads" directory so it can be accessed via the /uploads URL path
 
 
+class RequestSlots: # Bounded concurrency for a slow endpoint: a few requests run at once, a bounded number wait, the rest get 503
+    def __init__(self, limit: int, max_waiting: int, busy_detail: str):
+        # Waiters park on the event loop, not on a worker thread, so only running requests use the threadpool;
+        # the semaphore and the counter are only touched from the loop, so they need no lock
+        self._slots = asyncio.Semaphore(limit)
+        self._max_pending = limit + max_waiting
+        self._busy_detail = busy_detail
+        self._pending = 0 # Requests running or waiting for a slot
+
+    @asynccontextmanager
+    async def hold(self):
+        """Hold one slot for the duration of the block, or fail fast with 503 when the queue is full"""
+        if self._pending >= self._max_pending:
+            raise HTTPException(status_code=503, detail=self._busy_detail)
+        self._pending += 1
+        try:
+            async with self._slots:
+                yield
+        finally:
+            self._pending -= 1
+
+
+# Quiz submissions wait on OpenAI for the roadmap, and a first task assignment generates the whole schedule,
+# so only a few of each run at once (each on a worker thread); a bounded number may queue on the event loop, the rest are turned away.
+# Both caps draw on the one threadpool every plain def endpoint and run_in_threadpool call shares (anyio's default, 40 threads):
+# only running requests hold a thread, so together they hold at most SLOW_REQUEST_THREADS of them, leaving the rest for
+# login, /tasks/*, health and the other endpoints. Size the caps together, keeping the sum well under THREADPOOL_THREADS
+THREADPOOL_THREADS = 40
+QUIZ_SUBMIT_CONCURRENCY = ROADMAP_CONNECTIONS # One roadmap call per running submission, each with its own OpenAI connection
+QUIZ_SUBMIT_MAX_WAITING = 64
+TASK_ASSIGN_CONCURRENCY = 4
+TASK_ASSIGN_MAX_WAITING = 32
+SLOW_REQUEST_THREADS = QUIZ_SUBMIT_CONCURRENCY + TASK_ASSIGN_CONCURRENCY # 12 of 40; waiting requests hold none
+QUIZ_SUBMIT_SLOTS = RequestSlots(QUIZ_SUBMIT_CONCURRENCY, QUIZ_SUBMIT_MAX_WAITING, "Too many quiz submissions in progress, please try again shortly")
+TASK_ASSIGN_SLOTS = RequestSlots(TASK_ASSIGN_CONCURRENCY, TASK_ASSIGN_MAX_WAITING, "Too many task assignments in progress, please try again shortly")
+
 
 class StartQuizRequest(BaseModel):# Define request model for starting a quiz
     user_name: str = Field(min_length=1)    # The name of the user starting the quiz, must be at least 1 character
@@ -252,7 +339,7 @@ class AssignTaskResponse(BaseModel):# Define response model for assigning a task
     task_number: int # The task number in sequence
     task_description: str # The description of the assigned task
     due_date: str # The due date for the task
-    email_sent: bool  # Whether an email notification was successfully sent
+    email_sent: bool  # Whether an email notification was queued (it is delivered in the background)
     error: bool = False # Whether the assignment encountered an error
     message: Optional[str] = None # Optional message containing extra details or error info
 
@@ -275,65 +362,56 @@ def health_check():
 
 @app.post("/quiz/start", response_model=StartQuizResponse) # Endpoint to start a quiz
 def start_quiz(payload: StartQuizRequest):
-    state = {"user_name": payload.user_name} # Store user name in state for quiz tracking
-    data = quiz_app.start_quiz(state) # Start the quiz using the quiz application logic
-    return {"quiz": data["quiz"], "message": data["message"]} # Return the quiz questions and message
+    quiz_app = get_quiz_app()
+    # The questions are the same for every user, so hand out the shared table with a personalized greeting
+    return {"quiz": quiz_app.questions, "message": quiz_app.welcome_message(payload.user_name)} # Return the quiz questions and message
 
 
 @app.post("/quiz/submit", response_model=SubmitQuizResponse) # Endpoint to submit quiz answers
-def submit_quiz(payload: SubmitQuizRequest):
+async def submit_quiz(payload: SubmitQuizRequest):
     user_name = payload.user_name.strip() # Remove extra spaces from the user name
     if not user_name: # Validate that user name is not empty
         raise HTTPException(status_code=400, detail="user_name is required")
 
-    # Run the quiz graph to process answers and generate a learning roadmap
-    roadmap = quiz_app.run_quiz_graph(user_name, payload.user_answers)
+    quiz_app = await run_in_threadpool(get_quiz_app) # First use may build the app, so keep it off the loop
+    # Normalize each answer exactly once, here at the boundary, so the graph receives canonical option letters
+    # in question order; incomplete or invalid submissions are rejected before queueing for a slot
+    answers = [(payload.user_answers.get(q_no) or "").strip().lower() for q_no in quiz_app.questions]
+    if not all(answers):
+        raise HTTPException(status_code=400, detail=f"Please answer all {len(quiz_app.questions)} questions before submitting.")
+    for (q_no, question), answer in zip(quiz_app.questions.items(), answers):
+        if answer not in question["options"]:
+            raise HTTPException(status_code=400, detail=f"Invalid answer for question {q_no}")
 
-     # Calculate the score based on correct answers
-    score = sum(
-        1 for q_no, correct in quiz_app.correct_answers.items()
-        if payload.user_answers.get(q_no, "").lower().strip() == correct
-    )
-    level = "Beginner" if score <= 3 else ("Intermediate" if score <= 6 else "Advanced")# Determine user's skill level based on score
+    # Run the quiz graph to score the answers, pick the level and generate a learning roadmap (scored once, in the graph)
+    async with QUIZ_SUBMIT_SLOTS.hold(): # Waiting requests stay on the event loop; only the running ones take a worker thread
+        roadmap, score, level = await run_in_threadpool(quiz_app.run_quiz_graph, user_name, answers)
 
     return {"score": score, "level": level, "roadmap": roadmap}# Return score, level, and roadmap
 
 
 @app.post("/tasks/assign", response_model=AssignTaskResponse) # Endpoint to assign a task to a user based on quiz results
-def assign_task(payload: AssignTaskRequest):
-    # Fetch last quiz result (score/level/roadmap) inside backend the same way app.py did
-    import sqlite3 # Import SQLite to interact with the database
-    conn = sqlite3.connect("user_learning.db") # Connect to the database storing user learning progress
-    cursor = conn.cursor() # Create a cursor object to execute SQL queries
-    cursor.execute(# Fetch the last quiz result (score, level, and roadmap) for the given user
-        """
-        SELECT score, level, roadmap FROM users 
-        WHERE name = ? ORDER BY id DESC LIMIT 1
-        """,
-        (payload.user_name,), # Parameterized query to avoid SQL injection
-    )
-    row = cursor.fetchone() # Retrieve the first (latest) matching row
-    conn.close()# Close the database connection
+async def assign_task(payload: AssignTaskRequest):
+    row = await run_in_threadpool(_select_latest_result, payload.user_name) # The sqlite read blocks, so it runs on a worker thread
 
     if not row: # If no quiz result was found, inform the user to complete the quiz first
         raise HTTPException(status_code=404, detail="No quiz results found for this user. Complete the quiz first.")
 
-    score, level, roadmap_str = row # Unpack retrieved values from the database
-    try:
-        roadmap = [] if not roadmap_str else __import__("json").loads(roadmap_str)# If roadmap exists, parse it from JSON string into a Python list
-    except Exception:
-        roadmap = []# If parsing fails, set an empty roadmap
+    score, level, roadmap_str, row_id = row # Unpack retrieved values from the database
+    roadmap = list(_parse_roadmap(row_id, roadmap_str))# Parsed roadmap as a Python list (repeat clicks hit the cache)
 
-    result = quiz_app.assign_task_to_user(payload.user_name, payload.user_email, level, roadmap, payload.duration_weeks)# Call the quiz_app logic to assign a task to the user based on quiz data
+    quiz_app = await run_in_threadpool(get_quiz_app)
+    async with TASK_ASSIGN_SLOTS.hold(): # May generate the whole schedule with OpenAI; shares the thread budget with quiz submissions
+        result = await run_in_threadpool(quiz_app.assign_task_to_user, payload.user_name, payload.user_email, level, roadmap, payload.duration_weeks)# Call the quiz_app logic to assign a task to the user based on quiz data
 
-    # If assignment returned an error (e.g., prerequisites not met), propagate gracefully
+# If assignment returned an error (e.g., prerequisites not met), propagate gracefully
     if result.get("error"): # If there was an error in task assignment, return a response with error info
         return AssignTaskResponse(
             task_id=0, # No valid task ID when there’s an error
             task_number=result.get("task_number", 0), # Task number if provided
             task_description=result.get("task_description", ""), # Task description if available
             due_date=result.get("due_date", ""), # Due date if available
-            email_sent=result.get("email_sent", False), # Whether notification email was sent
+            email_sent=result.get("email_sent", False), # Whether notification email was queued
             error=True,  # Mark response as error
             message=result.get("message", "Task assignment failed"),  # Error message
         )
@@ -343,19 +421,19 @@ def assign_task(payload: AssignTaskRequest):
         task_number=int(result["task_number"]), # Convert task number to integer
         task_description=result["task_description"], # Task details
         due_date=result["due_date"], # Task due date
-        email_sent=bool(result["email_sent"]),   # Whether email was sent
+        email_sent=bool(result["email_sent"]),   # Whether email was queued
         error=False, # No error occurred
     )
 
 
 @app.get("/tasks") # Endpoint to get all tasks assigned to a specific user
 def get_tasks(user_email: str):
-    return quiz_app.get_user_tasks(user_email) # Fetch tasks for the user using quiz_app’s logic
+    return get_quiz_app().get_user_tasks(user_email) # Fetch tasks for the user using quiz_app’s logic
 
 
 @app.post("/tasks/submit", response_model=SubmitTaskResponse) # Endpoint for users to submit their completed task
 def submit_task(payload: SubmitTaskRequest):
-    result = quiz_app.submit_user_task(payload.user_email, payload.task_id, payload.submission_content)# Call quiz_app logic to handle task submission
+    result = get_quiz_app().submit_user_task(payload.user_email, payload.task_id, payload.submission_content)# Call quiz_app logic to handle task submission
     return SubmitTaskResponse(success=bool(result.get("success")), message=result.get("message", "")) # Return submission success status and message
 
 
@@ -363,7 +441,7 @@ def submit_task(payload: SubmitTaskRequest):
 def get_users(user=Depends(get_current_user)):
     if not is_admin(user): # Restrict access to admins only
         raise HTTPException(status_code=403, detail="Forbidden")
-    return {"users": quiz_app.get_all_user_names()} # Fetch and return all user names
+    return {"users": get_quiz_app().get_all_user_names()} # Fetch and return all user names
 
 
 @app.get("/admin/user_summary")# Endpoint for admin to view a summary of a specific user’s activity
@@ -372,40 +450,32 @@ def admin_user_summary(user_email: str, user=Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Forbidden")
 
     # Find user's name from auth_users if available
-    conn = get_db_connection() # Connect to database to fetch user details
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM auth_users WHERE email = ?", (user_email.strip().lower(),))# Try to get the user's name from the auth_users table using their email
-    row = cursor.fetchone()
-    user_name = row[0] if row else None
-
-    # Latest quiz result by user name. # Initialize quiz stats
-    quiz_score = None
-    quiz_level = None
-    if user_name: # If user name exists, fetch their latest quiz score and level
-        cursor.execute(
+    with get_conn() as conn: # Borrow a pooled connection to fetch user details
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM auth_users WHERE email = ?", (user_email.strip().lower(),))# Try to get the user's name from the auth_users table using their email
+        row = cursor.fetchone()
+        user_name = row[0] if row else None
+
+        # Latest quiz result by user name. # Initialize quiz stats
+        quiz_score = None
+        quiz_level = None
+        if user_name: # If user name exists, fetch their latest quiz score and level
+            cursor.execute(SQL_SELECT_LATEST_RESULT, (user_name,))
+            qrow = cursor.fetchone()
+            if qrow:
+                quiz_score, quiz_level = qrow[0], qrow[1]
+
+        # Tasks list and stats by email
+        cursor.execute( # Fetch all tasks assigned to the user by email
             """
-            SELECT score, level FROM users
-            WHERE name = ?
-            ORDER BY id DESC LIMIT 1
+            SELECT id, task_number, task_description AS description, assigned_date, due_date, status, submitted_date, submission_content
+            FROM tasks
+            WHERE user_email = ?
+            ORDER BY task_number
             """,
-            (user_name,),
+            (user_email.strip().lower(),),
         )
-        qrow = cursor.fetchone()
-        if qrow:
-            quiz_score, quiz_level = qrow[0], qrow[1]
-
-    # Tasks list and stats by email
-    cursor.execute( # Fetch all tasks assigned to the user by email
-        """
-        SELECT id, task_number, task_description, assigned_date, due_date, status, submitted_date, submission_content
-        FROM tasks
-        WHERE user_email = ?
-        ORDER BY task_number
-        """,
-        (user_email.strip().lower(),),
-    )
-    tasks = cursor.fetchall()
-    conn.close()
+        tasks = cursor.fetchall()
 
     def to_url(path: Optional[str]) -> Optional[str]: # Helper function to convert file paths to public URLs
         if not path:
@@ -415,19 +485,11 @@ def admin_user_summary(user_email: str, user=Depends(get_current_user)):
             return f"/uploads/{norm.split('uploads/', 1)[1]}"
         return None
 
-    task_items = [  # Transform raw database task data into structured dictionaries
-        {
-            "id": t[0],
-            "task_number": t[1],
-            "description": t[2],
-            "assigned_date": t[3],
-            "due_date": t[4],
-            "status": t[5],
-            "submitted_date": t[6],
-            "file_url": to_url(t[7]), # Convert file path to URL
-        }
-        for t in tasks
-    ]
+    task_items = []  # Transform database rows into dictionaries; the column names are the response keys
+    for t in tasks:
+        item = dict(t)
+        item["file_url"] = to_url(item.pop("submission_content")) # Convert file path to URL
+        task_items.append(item)
     tasks_assigned = len(task_items)  # Count total tasks and completed tasks
     tasks_completed = sum(1 for t in task_items if t["status"] == "completed")
 
@@ -448,42 +510,31 @@ def user_self_summary(user=Depends(get_current_user)):
     email = user["email"].strip().lower()
     name = user.get("name")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Latest quiz result by user name
-    quiz_score = None
-    quiz_level = None
-    quiz_roadmap = []
-    if name:
+    with get_conn() as conn:
+        cursor = conn.cursor()
+
+        # Latest quiz result by user name
+        quiz_score = None
+        quiz_level = None
+        quiz_roadmap = []
+        if name:
+            cursor.execute(SQL_SELECT_LATEST_RESULT, (name,))
+            qrow = cursor.fetchone()
+            if qrow:
+                quiz_score, quiz_level, roadmap_str, row_id = qrow
+                quiz_roadmap = list(_parse_roadmap(row_id, roadmap_str))
+
+        # Tasks by email
         cursor.execute(
             """
-            SELECT score, level, roadmap FROM users
-            WHERE name = ?
-            ORDER BY id DESC LIMIT 1
+            SELECT id, task_number, task_description AS description, assigned_date, due_date, status, submitted_date, submission_content
+            FROM tasks
+            WHERE user_email = ?
+            ORDER BY task_number
             """,
-            (name,),
+            (email,),
         )
-        qrow = cursor.fetchone()
-        if qrow:
-            quiz_score, quiz_level, roadmap_str = qrow[0], qrow[1], qrow[2]
-            try:
-                quiz_roadmap = [] if not roadmap_str else __import__("json").loads(roadmap_str)
-            except Exception:
-                quiz_roadmap = []
-
-    # Tasks by email
-    cursor.execute(
-        """
-        SELECT id, task_number, task_description, assigned_date, due_date, status, submitted_date, submission_content
-        FROM tasks
-        WHERE user_email = ?
-        ORDER BY task_number
-        """,
-        (email,),
-    )
-    tasks = cursor.fetchall()
-    conn.close()
+        tasks = cursor.fetchall()
 
     def to_url(path: Optional[str]) -> Optional[str]:
         if not path:
@@ -493,19 +544,11 @@ def user_self_summary(user=Depends(get_current_user)):
             return f"/uploads/{norm.split('uploads/', 1)[1]}"
         return None
 
-    task_items = [
-        {
-            "id": t[0],
-            "task_number": t[1],
-            "description": t[2],
-            "assigned_date": t[3],
-            "due_date": t[4],
-            "status": t[5],
-            "submitted_date": t[6],
-            "file_url": to_url(t[7]),
-        }
-        for t in tasks
-    ]
+    task_items = []
+    for t in tasks:
+        item = dict(t)
+        item["file_url"] = to_url(item.pop("submission_content"))
+        task_items.append(item)
 
     return {
         "name": name,
@@ -519,15 +562,9 @@ def user_self_summary(user=Depends(get_current_user)):
 def admin_list_users(user=Depends(get_current_user)):
     if not is_admin(user): # Restrict access to admins only
         raise HTTPException(status_code=403, detail="Forbidden")
-    conn = get_db_connection() # Connect to database
-    cursor = conn.cursor()
-    cursor.execute("SELECT name, email FROM auth_users WHERE role != 'admin' ORDER BY name COLLATE NOCASE") # Fetch names and emails of all users except admins
-    rows = cursor.fetchall()
-    conn.close()
-    users = [# Convert query results to list of dictionaries
-        {"name": r[0], "email": r[1]}
-        for r in rows
-    ]
+    with get_conn() as conn: # Borrow a pooled connection
+        rows = conn.execute("SELECT name, email FROM auth_users WHERE role != 'admin' ORDER BY name COLLATE NOCASE").fetchall() # Fetch names and emails of all users except admins
+    users = [dict(r) for r in rows]# Convert query results to list of dictionaries
     return {"users": users} # Return user list
 
 @app.delete("/admin/users/{user_email}") # Endpoint for admin to delete a user
@@ -539,49 +576,48 @@ def admin_delete_user(user_email: str, user=Depends(get_current_user)):
     if user_email.lower() == user["email"].lower():
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
     
-    conn = get_db_connection() # Connect to database
-    cursor = conn.cursor()
-    
     try:
-        # Check if user exists
-        cursor.execute("SELECT name, role FROM auth_users WHERE email = ?", (user_email.lower(),))
-        user_to_delete = cursor.fetchone()
-        
-        if not user_to_delete:
-            conn.close()
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        user_name, user_role = user_to_delete
-        
-        # Prevent deletion of other admins
-        if user_role == "admin":
-            conn.close()
-            raise HTTPException(status_code=400, detail="Cannot delete other admin accounts")
-        
-        # Delete user's tasks
-        cursor.execute("DELETE FROM tasks WHERE user_email = ?", (user_email.lower(),))
-        tasks_deleted = cursor.rowcount
-        
-        # Delete user's quiz results
-        cursor.execute("DELETE FROM users WHERE name = ?", (user_name,))
-        quiz_results_deleted = cursor.rowcount
-        
-        # Delete user's progress
-        cursor.execute("DELETE FROM user_progress WHERE user_email = ?", (user_email.lower(),))
-        progress_deleted = cursor.rowcount
+        # All deletes commit together or not at all
+        with get_transaction() as conn:
+            cursor = conn.cursor()
+
+            # Check if user exists
+            cursor.execute("SELECT name, role FROM auth_users WHERE email = ?", (user_email.lower(),))
+            user_to_delete = cursor.fetchone()
+            
+            if not user_to_delete:
+                raise HTTPException(status_code=404, detail="User not found")
+            
+            user_name, user_role = user_to_delete
+            
+            # Prevent deletion of other admins
+            if user_role == "admin":
+                raise HTTPException(status_code=400, detail="Cannot delete other admin accounts")
+            
+            # Delete user's tasks
+            cursor.execute("DELETE FROM tasks WHERE user_email = ?", (user_email.lower(),))
+            tasks_deleted = cursor.rowcount
+            
+            # Delete user's quiz results
+            cursor.execute("DELETE FROM users WHERE name = ?", (user_name,))
+            quiz_results_deleted = cursor.rowcount
+            
+            # Delete user's progress
+            cursor.execute("DELETE FROM user_progress WHERE user_email = ?", (user_email.lower(),))
+            progress_deleted = cursor.rowcount
+            
+            # Finally, delete the user account
+            cursor.execute("DELETE FROM auth_users WHERE email = ?", (user_email.lower(),))
+            user_deleted = cursor.rowcount
         
-        # Delete user's uploaded files (if any)
+        # Delete user's uploaded files (if any), only once the rows are committed, and without holding the write lock
         user_upload_dir = os.path.join("uploads", user_email.lower())
         if os.path.exists(user_upload_dir):
-            import shutil
             shutil.rmtree(user_upload_dir)
         
-        # Finally, delete the user account
-        cursor.execute("DELETE FROM auth_users WHERE email = ?", (user_email.lower(),))
-        user_deleted = cursor.rowcount
-        
-        conn.commit()
-        conn.close()
+        task_manager = get_quiz_app().task_manager
+        task_manager.clear_user_names_cache() # The deleted user's name must drop out of the admin list
+        task_manager.clear_user_tasks_cache() # ...and their tasks out of the cached task lists
         
         if user_deleted > 0:
             return {
@@ -598,7 +634,6 @@ def admin_delete_user(user_email: str, user=Depends(get_current_user)):
             raise HTTPException(status_code=500, detail="Failed to delete user")
             
     except Exception as e:
-        conn.close()
         raise HTTPException(status_code=500, detail=f"Error deleting user: {str(e)}")
 
 
@@ -613,8 +648,8 @@ def get_task_files(user_email: str):
             return f"/uploads/{norm.split('uploads/', 1)[1]}"
         return None
 
-    file1 = quiz_app.get_task_file(user_email, 1) # Retrieve file paths for task 1 and task 2 from quiz_app
-    file2 = quiz_app.get_task_file(user_email, 2)
+    file1 = get_quiz_app().get_task_file(user_email, 1) # Retrieve file paths for task 1 and task 2 from quiz_app
+    file2 = get_quiz_app().get_task_file(user_email, 2)
     return { # Return converted URLs for each task file
         "task1": path_to_url(file1),
         "task2": path_to_url(file2),
@@ -629,13 +664,14 @@ async def upload_task_file(
 ):
     # Persist uploaded file temporarily, then delegate to TaskManager to save/move
     suffix = os.path.splitext(file.filename or "")[1] # Get file extension for later saving
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:  # Save uploaded file temporarily to a temp location
-        content = await file.read() # Read uploaded file content
-        tmp.write(content) # Write content to temp file
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=UPLOAD_TMP_DIR) as tmp:  # Save uploaded file temporarily next to uploads/
+        # Copy straight from the spooled upload, 1 MiB at a time, on a worker thread
+        await run_in_threadpool(shutil.copyfileobj, file.file, tmp, UPLOAD_CHUNK_SIZE)
         tmp_path = tmp.name # Store temp file path
 
     try:
-        dest_path = quiz_app.save_task_file(user_email, int(task_number), tmp_path)  # Pass temp file to quiz_app to handle permanent storage
+        # Pass temp file to quiz_app to handle permanent storage; the file move and sqlite UPDATE block, so keep them off the event loop
+        dest_path = await run_in_threadpool(lambda: get_quiz_app().save_task_file(user_email, int(task_number), tmp_path)) # First use may build the app, also off the loop
     finally:
         # Cleanup temp file
         try: # Always try to delete temp file after saving
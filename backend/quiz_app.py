@@ -1,94 +1,148 @@
 
-import sqlite3
 import json
-import os
-from openai import OpenAI
+import threading
+from operator import eq
+from collections import OrderedDict
 from langgraph.graph import StateGraph
-from typing import TypedDict, Dict, List, Optional
-from dotenv import load_dotenv
+from openai import APIError, APIConnectionError, APITimeoutError, RateLimitError
+from typing import TypedDict, Dict, List, Optional, Tuple, Union
 
-from task_manager import TaskManager  # Import TaskManager
+from task_manager import TaskManager, get_settings, get_openai_client, get_conn, OPENAI_LIMITER, estimate_tokens  # Import TaskManager and the shared settings/client/db pool/throttle helpers
 
-# Load environment
-load_dotenv()
-openai_api_key = os.getenv("OPENAI_API_KEY")
-OPENAI_AVAILABLE = bool(openai_api_key)
+# Load environment (parsed once and shared with task_manager)
+openai_api_key = get_settings().openai_api_key
+OPENAI_AVAILABLE = get_settings().openai_available
+
+# Generated roadmaps keyed by which questions were answered correctly (score and level follow from that),
+# so a repeated answer pattern skips the OpenAI call; least recently used entries are evicted past the limit
+ROADMAP_CACHE_SIZE = 1024
+_ROADMAP_CACHE = OrderedDict()
+_ROADMAP_CACHE_LOCK = threading.Lock()
 
 class QuizState(TypedDict):
     user_name: str
-    user_answers: Dict[str, str]
+    user_answers: Union[Dict[str, str], List[str]]
     score: Optional[int]
     level: Optional[str]
     roadmap: Optional[List[str]]
+    correct: Optional[Tuple[bool, ...]]
+
+
+# Option letters, in display order; every question uses the same four
+CHOICES = ("a", "b", "c", "d")
+
+# The quiz, one row per question: (text, option texts in CHOICES order, correct option, topic). Single source of truth for
+# the questions sent to clients, the answer key and the topics used in the roadmap prompt
+QUIZ = (
+    ("What is the correct file extension for Python files?",
+     (".pyth", ".pt", ".py", ".pyt"), "c", "Python syntax and file handling"),
+    ("What is the output of print(3 + 2 * 2)?",
+     ("10", "7", "12", "9"), "b", "Python operator precedence"),
+    ("Which data structure stores key-value pairs?",
+     ("List", "Set", "Tuple", "Dictionary"), "d", "Python data structures - Dictionary"),
+    ("Which library is used for numerical computing?",
+     ("NumPy", "Seaborn", "Flask", "BeautifulSoup"), "a", "Numerical computing with NumPy"),
+    ("Purpose of the fit() method in ML?",
+     ("It trains the model", "It tests the model", "It saves the model", "It visualizes the model"), "a", "Machine learning model training concepts"),
+    ("What does 'self' refer to in a class method?",
+     ("The method name", "The class itself", "An instance of the class", "A global variable"), "c", "OOP and class methods in Python"),
+    ("Activation function for non-linearity in DNN?",
+     ("Sigmoid", "ReLU", "Tanh", "All of the above"), "d", "Deep learning activation functions"),
+    ("Technique to prevent overfitting in NNs?",
+     ("Batch normalization", "Regularization", "Dropout", "Backpropagation"), "c", "Overfitting and regularization techniques"),
+    ("Purpose of gradient descent?",
+     ("Making decisions", "Optimizing parameters", "Increasing complexity", "Normalizing dataset"), "b", "Gradient descent and optimization in ML"),
+    ("Main difference: supervised vs unsupervised learning?",
+     ("Supervised doesn't use labels", "Supervised is faster", "Supervised uses labels", "No difference"), "c", "Difference between supervised and unsupervised learning"),
+)
+
+# Quiz questions with text and multiple-choice options; identical for every user, so built once at import
+# (answers and topics stay server-side)
+QUESTIONS = {
+    str(number): {"text": text, "options": dict(zip(CHOICES, options))}
+    for number, (text, options, _, _) in enumerate(QUIZ, 1)
+}
+# Dictionary of correct answers (question_number: correct_option)
+CORRECT_ANSWERS = {str(number): answer for number, (_, _, answer, _) in enumerate(QUIZ, 1)}
+# Map each question to its related topic
+QUESTION_TOPICS = {str(number): topic for number, (_, _, _, topic) in enumerate(QUIZ, 1)}
+# Question keys in order and the matching answer key, normalized once so scoring is a straight comparison
+_QKEYS = tuple(QUESTIONS)
+_CORRECT = tuple(CORRECT_ANSWERS[q].strip().lower() for q in _QKEYS)
+
+# Deterministic roadmap used when OpenAI is not configured; kept as lines so it is not joined only to be split again
+FALLBACK_ROADMAP_LINES = (
+    "Weak Areas",
+    "1. Review incorrect topics",
+    "- Watch 1-2 short tutorials per topic",
+    "- Complete a small exercise for each",
+    "Strong Areas",
+    "1. Reinforce strengths",
+    "- Try a slightly harder problem",
+    "- Teach the concept to someone or write notes",
+)
+
+
+# Personalized greeting shown with the quiz
+WELCOME_MESSAGE_TEMPLATE = "Welcome {user_name}! Please answer the following quiz questions."
+
+# Roadmap request sent to the AI tutor; only the score, level and topic lists change per user
+ROADMAP_PROMPT_TEMPLATE = """
+You are an AI tutor. A user scored {score}/10 in AI quiz and is categorized as {level} level.
+Based on their answers, identify:
+
+1. Their weak areas (the questions they got wrong)
+2. Their strong areas (the ones they got right)
+
+Each question is mapped to a topic.
+
+Incorrect Topics:
+{wrong_topics}
+
+Correct Topics:
+{correct_topics}
+
+Now generate a focused learning roadmap:
+- Group weak areas first and suggest how to study/improve each.
+- Recommend specific resources (e.g., topics to search on YouTube, courses, or exercises).
+- Then briefly reinforce strong areas (encourage practice or learning deeper concepts).
+
+Return the roadmap as a structured list:
+- Use clear section headers like "Weak Areas" and "Strong Areas"
+- Use numbered lists for main topics
+- Use bullet points for resources and sub-items
+- Keep descriptions concise and actionable
+- Focus on practical learning steps
+"""
 
 
 class QuizApp: # Main class that handles quiz logic, evaluation, and roadmap creation
     def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key) if api_key else None # Initialize OpenAI client for roadmap generation
-        self.correct_answers = {# Dictionary of correct answers (question_number: correct_option)
-            "1": "c", "2": "b", "3": "d", "4": "a", "5": "a", 
-            "6": "c", "7": "d", "8": "c", "9": "b", "10": "c"
-        }
+        self.client = get_openai_client(api_key) if api_key else None # Shared OpenAI client (same connection pool as TaskManager) for roadmap generation
+        self.questions = QUESTIONS # Shared prebuilt questions (treat as read-only)
+        self.correct_answers = CORRECT_ANSWERS # Dictionary of correct answers (question_number: correct_option)
         self.graph = self.build_graph()# Build the quiz flow graph
         self.app = self.graph.compile()# Compile the state machine for execution
         self.task_manager = TaskManager(api_key)# Task manager instance to handle task assignments and submissions
 
-    def start_quiz(self, state):# Step 1: Start quiz by returning questions and welcome message
-        questions = {# Dictionary of quiz questions with text and multiple-choice options
-        "1": {
-            "text": "What is the correct file extension for Python files?",
-            "options": {"a": ".pyth", "b": ".pt", "c": ".py", "d": ".pyt"}
-        },
-        "2": {
-            "text": "What is the output of print(3 + 2 * 2)?",
-            "options": {"a": "10", "b": "7", "c": "12", "d": "9"}
-        },
-        "3": {
-            "text": "Which data structure stores key-value pairs?",
-            "options": {"a": "List", "b": "Set", "c": "Tuple", "d": "Dictionary"}
-        },
-        "4": {
-            "text": "Which library is used for numerical computing?",
-            "options": {"a": "NumPy", "b": "Seaborn", "c": "Flask", "d": "BeautifulSoup"}
-        },
-        "5": {
-            "text": "Purpose of the fit() method in ML?",
-            "options": {"a": "It trains the model", "b": "It tests the model", "c": "It saves the model", "d": "It visualizes the model"}
-        },
-        "6": {
-            "text": "What does 'self' refer to in a class method?",
-            "options": {"a": "The method name", "b": "The class itself", "c": "An instance of the class", "d": "A global variable"}
-        },
-        "7": {
-            "text": "Activation function for non-linearity in DNN?",
-            "options": {"a": "Sigmoid", "b": "ReLU", "c": "Tanh", "d": "All of the above"}
-        },
-        "8": {
-            "text": "Technique to prevent overfitting in NNs?",
-            "options": {"a": "Batch normalization", "b": "Regularization", "c": "Dropout", "d": "Backpropagation"}
-        },
-        "9": {
-            "text": "Purpose of gradient descent?",
-            "options": {"a": "Making decisions", "b": "Optimizing parameters", "c": "Increasing complexity", "d": "Normalizing dataset"}
-        },
-        "10": {
-            "text": "Main difference: supervised vs unsupervised learning?",
-            "options": {"a": "Supervised doesn't use labels", "b": "Supervised is faster", "c": "Supervised uses labels", "d": "No difference"}
-        },
-    }
+    def welcome_message(self, user_name: str) -> str:# Personalized greeting shown with the quiz
+        return WELCOME_MESSAGE_TEMPLATE.format_map({"user_name": user_name})
 
+    def start_quiz(self, state):# Step 1: Start quiz by returning questions and welcome message
         return {# Return the quiz questions along with a personalized welcome message
-        "quiz": questions,
-        "message": f"Welcome {state.get('user_name', 'Guest')}! Please answer the following quiz questions."
+        "quiz": self.questions,
+        "message": self.welcome_message(state.get("user_name", "Guest"))
     }
 
     def evaluate_quiz(self, state):# Step 2: Evaluate quiz and calculate score
-        user_answers = state.get("user_answers", {}) # Get user's submitted answers
-        score = sum(# Compare each answer with correct answers and count matches
-            1 for q_no, correct in self.correct_answers.items()
-            if user_answers.get(q_no, "").lower().strip() == correct
-        )
-        return {"score": score}
+        user_answers = state.get("user_answers", {}) # Get user's submitted answers: {question_number: option} or options in question order
+        if isinstance(user_answers, dict):
+            user_answers = [user_answers.get(q) for q in _QKEYS]
+        # Callers hand in canonical letters (the API and the CLI normalize and validate at input time)
+        normalized = list(user_answers[:len(_QKEYS)])
+        normalized += [""] * (len(_QKEYS) - len(normalized)) # Unanswered questions count as wrong
+        correct = tuple(map(eq, normalized, _CORRECT)) # Per-question result (compared in C), reused by the roadmap step
+        return {"score": sum(correct), "correct": correct}
 
     def check_proficiency(self, state):# Step 3: Determine proficiency level based on score
         score = state["score"]
@@ -101,86 +155,64 @@ class QuizApp: # Main class that handles quiz logic, evaluation, and roadmap cre
         return {"level": level}
 
     def suggest_roadmap(self, state):# Step 4: Suggest a learning roadmap based on quiz results
-        user_answers = state.get("user_answers", {})# Extract user answers, score, and level
+        correct = state.get("correct") or (False,) * len(_QKEYS)# Per-question results from evaluate_quiz, plus score and level
         score = state.get("score")
         level = state.get("level")
 
-        question_topics = {# Map each question to its related topic
-            "1": "Python syntax and file handling",
-            "2": "Python operator precedence",
-            "3": "Python data structures - Dictionary",
-            "4": "Numerical computing with NumPy",
-            "5": "Machine learning model training concepts",
-            "6": "OOP and class methods in Python",
-            "7": "Deep learning activation functions",
-            "8": "Overfitting and regularization techniques",
-            "9": "Gradient descent and optimization in ML",
-            "10": "Difference between supervised and unsupervised learning"
-        }
+        if self.client:
+            with _ROADMAP_CACHE_LOCK:
+                cached = _ROADMAP_CACHE.get(correct)
+                if cached is not None:
+                    _ROADMAP_CACHE.move_to_end(correct) # Mark as recently used
+            if cached is not None:
+                return {"roadmap": list(cached)}
 
         wrong_questions = [] # Separate correct and incorrect answers for roadmap generation
         correct_questions = []
 
-        for q_no, correct_ans in self.correct_answers.items():
-            if user_answers.get(q_no, "").lower().strip() == correct_ans:
-                correct_questions.append((q_no, question_topics[q_no]))
+        for q_no, is_correct in zip(_QKEYS, correct):
+            if is_correct:
+                correct_questions.append((q_no, QUESTION_TOPICS[q_no]))
             else:
-                wrong_questions.append((q_no, question_topics[q_no]))
-        # Build a prompt for the AI tutor to generate a roadmap
-        prompt = f""" 
-You are an AI tutor. A user scored {score}/10 in AI quiz and is categorized as {level} level.
-Based on their answers, identify:
-
-1. Their weak areas (the questions they got wrong)
-2. Their strong areas (the ones they got right)
-
-Each question is mapped to a topic.
-
-Incorrect Topics:
-{json.dumps(wrong_questions, indent=2)}
-
-Correct Topics:
-{json.dumps(correct_questions, indent=2)}
-
-Now generate a focused learning roadmap:
-- Group weak areas first and suggest how to study/improve each.
-- Recommend specific resources (e.g., topics to search on YouTube, courses, or exercises).
-- Then briefly reinforce strong areas (encourage practice or learning deeper concepts).
-
-Return the roadmap as a structured list:
-- Use clear section headers like "Weak Areas" and "Strong Areas"
-- Use numbered lists for main topics
-- Use bullet points for resources and sub-items
-- Keep descriptions concise and actionable
-- Focus on practical learning steps
-"""
-
-        if not self.client:
-            # Fallback deterministic roadmap when OpenAI is not configured
-            roadmap_text = "\n".join([
-                "Weak Areas",
-                "1. Review incorrect topics",
-                "- Watch 1-2 short tutorials per topic",
-                "- Complete a small exercise for each",
-                "Strong Areas",
-                "1. Reinforce strengths",
-                "- Try a slightly harder problem",
-                "- Teach the concept to someone or write notes",
-            ])
-        else:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are an expert tutor that builds personalized learning plans."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=700,
-            )
-
-            roadmap_text = response.choices[0].message.content.strip()
+                wrong_questions.append((q_no, QUESTION_TOPICS[q_no]))
+
+        raw_lines = None
+        if self.client:
+            prompt = ROADMAP_PROMPT_TEMPLATE.format_map({ # Build a prompt for the AI tutor to generate a roadmap
+                "score": score,
+                "level": level,
+                "wrong_topics": json.dumps(wrong_questions, indent=2),
+                "correct_topics": json.dumps(correct_questions, indent=2),
+            })
+            messages = [
+                {"role": "system", "content": "You are an expert tutor that builds personalized learning plans."},
+                {"role": "user", "content": prompt}
+            ]
+            # The client already retries 429s, timeouts and dropped connections with backoff; whatever
+            # still fails lands here and the user gets the default roadmap instead of a 500
+            try:
+                # Concurrent roadmap calls are bounded by api.py's QUIZ_SUBMIT_SLOTS (one per running submission), not here
+                OPENAI_LIMITER.acquire(estimate_tokens(messages, 700)) # Share the RPM/TPM budget with task generation
+                response = self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=700,
+                )
+                raw_lines = response.choices[0].message.content.strip().splitlines()
+            except RateLimitError:
+                print("OpenAI rate limit reached while generating roadmap; using the default roadmap.")
+            except APITimeoutError:
+                print("OpenAI timed out while generating roadmap; using the default roadmap.")
+            except APIConnectionError:
+                print("Could not reach OpenAI while generating roadmap; using the default roadmap.")
+            except APIError as e:
+                print(f"Roadmap generation failed: {e}")
+        cacheable = raw_lines is not None # Only cache what the model actually produced
+        if raw_lines is None:
+            raw_lines = FALLBACK_ROADMAP_LINES # Fallback deterministic roadmap when OpenAI is not configured or failed (already split into lines)
         roadmap_lines = []
-        for line in roadmap_text.splitlines():
+        for line in raw_lines:
             stripped = line.strip()
             if not stripped:
                 roadmap_lines.append("")
@@ -196,6 +228,12 @@ Return the roadmap as a structured list:
                 roadmap_lines.append(f"  • {stripped[1:].strip()}")
             else:
                 roadmap_lines.append(f"  {stripped}")
+        if cacheable:
+            with _ROADMAP_CACHE_LOCK:
+                _ROADMAP_CACHE[correct] = tuple(roadmap_lines) # Immutable copy; callers get their own list
+                _ROADMAP_CACHE.move_to_end(correct)
+                if len(_ROADMAP_CACHE) > ROADMAP_CACHE_SIZE:
+                    _ROADMAP_CACHE.popitem(last=False)
         return {"roadmap": roadmap_lines}
 
     def store_result(self, state):# Step 5: Store quiz result and roadmap in the database
@@ -205,14 +243,12 @@ Return the roadmap as a structured list:
         level = state.get("level")
 
         roadmap_str = json.dumps(roadmap)# Convert roadmap list to JSON string for storage
-        conn = sqlite3.connect("user_learning.db")# Save data to SQLite database
-        cursor = conn.cursor()
-        cursor.execute(""" 
-        INSERT INTO users (name, score, level, roadmap)
-        VALUES (?, ?, ?, ?)
-        """, (name, score, level, roadmap_str))
-        conn.commit()
-        conn.close()
+        with get_conn() as conn:# Save data to SQLite database on a pooled connection (WAL, synchronous=NORMAL, autocommit)
+            conn.execute(""" 
+            INSERT INTO users (name, score, level, roadmap)
+            VALUES (?, ?, ?, ?)
+            """, (name, score, level, roadmap_str))
+        self.task_manager.clear_user_names_cache() # A new name may have been added
 
         return {"message": f"Roadmap saved for {name}."}
 
@@ -237,12 +273,13 @@ Return the roadmap as a structured list:
 
         return graph
 
-    def run_quiz_graph(self, user_name: str, user_answers: Dict[str, str]) -> List[str]:# Method to run the complete quiz process
+    def run_quiz_graph(self, user_name: str, user_answers: Union[Dict[str, str], List[str]]) -> Tuple[List[str], int, str]:# Method to run the complete quiz process
+        """Run the quiz graph and return (roadmap, score, level) as computed by its nodes"""
         final_state = self.app.invoke({
             "user_name": user_name,
             "user_answers": user_answers
         })
-        return final_state.get("roadmap", [])
+        return final_state.get("roadmap", []), final_state.get("score"), final_state.get("level")
 
     # Task management methods
     def assign_task_to_user(self, user_name: str, user_email: str, level: str, roadmap: List[str], duration_weeks: int = 4):# Task management methods (delegated to TaskManager)
@@ -274,14 +311,11 @@ def run_cli():
     print("\n Welcome to the Personalized Learning Quiz\n")
     user_name = input("Enter your name: ").strip()
 
-    # Just call the start_quiz method directly
-    initial_state = {"user_name": user_name}
-    start_response = app.start_quiz(initial_state)
-    questions = start_response.get("quiz", {})
+    questions = app.questions # Same table for every user; no need to go through start_quiz
 
     print("\nAnswer the following questions (type a, b, c, or d):\n")
 
-    answers = {}
+    answers = [] # Positional, in question order
     for q_num, q_data in questions.items():
         print(f"{q_num}. {q_data['text']}")
         for opt, val in q_data["options"].items():
@@ -289,14 +323,14 @@ def run_cli():
         while True:
             user_answer = input("Your answer (a/b/c/d): ").lower().strip()
             if user_answer in q_data["options"]:
-                answers[q_num] = user_answer
+                answers.append(user_answer)
                 break 
             else:
                 print("Invalid input. Please choose a, b, c, or d.")
         print()
 
     # Now run the full graph with user answers
-    roadmap = app.run_quiz_graph(user_name, answers)
+    roadmap, _, _ = app.run_quiz_graph(user_name, answers)
     print(f"\nRecommended Roadmap for {user_name}:\n")
     for line in roadmap:
         print(line)
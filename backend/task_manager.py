@@ -2,101 +2,506 @@
 import sqlite3
 import os
 import smtplib
+import threading
+import queue
+import time
+import json
+import hashlib
+import html
+import itertools
+from functools import lru_cache
+from types import SimpleNamespace
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import httpx
 from openai import OpenAI
-from typing import List
+from typing import List, Optional, Tuple
 import shutil
 
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-openai_api_key = os.getenv("OPENAI_API_KEY")
-email_password = os.getenv("EMAIL_PASSWORD")
-email_address = os.getenv("EMAIL_ADDRESS")
 
+@lru_cache(maxsize=None)
+def get_settings():
+    """Load .env once per process and return the settings the backend reads from the environment"""
+    load_dotenv()
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    email_password = os.getenv("EMAIL_PASSWORD")
+    email_address = os.getenv("EMAIL_ADDRESS")
+    return SimpleNamespace(
+        openai_api_key=openai_api_key,
+        email_password=email_password,
+        email_address=email_address,
+        openai_available=bool(openai_api_key),
+        email_available=bool(email_password and email_address),
+    )
+
+DB_PATH = "user_learning.db"
+
+# Idle SQLite connections kept open for reuse across requests (busy bursts open extra, short-lived ones)
+POOL_SIZE = 8
+
+# Set once the tables and indexes exist, so later TaskManager instances skip the DDL
+_SCHEMA_READY = False
+_SCHEMA_LOCK = threading.Lock() # Makes concurrent first constructions wait for one DDL run instead of racing
+
+# Applied once to every new connection instead of on each call (per-connection settings)
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL", # One fsync per WAL checkpoint instead of per commit
+    "PRAGMA busy_timeout=30000",
+    "PRAGMA cache_size=-40000", # ~40 MB page cache per connection
+    "PRAGMA temp_store=MEMORY", # Sorts and temp B-trees (e.g. for DISTINCT) stay off disk
+    "PRAGMA mmap_size=268435456", # Read pages through a 256 MB memory map instead of read() calls
+)
+
+# Background thread that delivers email so requests don't wait on SMTP. One worker drains the
+# queue over the single persistent SMTP session; more would only wait on its lock
+EMAIL_WORKERS = 1
+
+# Upper bound on concurrent OpenAI requests when generating a schedule
+MAX_GENERATION_WORKERS = 8
+# Shared threads that run streamed completions (primaries and hedges) for every TaskManager
+OPENAI_WORKERS = MAX_GENERATION_WORKERS * 2
+
+# Fixed instructions for task generation. They go first and never change between calls,
+# so OpenAI's automatic prompt caching can reuse the prefix; per-user details follow in the user message.
+TASK_SYSTEM_PROMPT = """You are an expert learning coach that creates personalized, practical learning tasks.
+
+You will be given a learner's level, their personalized learning roadmap and the number of the task
+to create. For task 2 you will also be given the previous task, and the new task must build on it.
+
+Requirements:
+- Task should be practical and hands-on
+- Include specific learning objectives
+- Provide clear instructions
+- Suggest resources or tools if needed
+- Make it achievable within 3-4 days
+- Include a brief explanation of why this task is important for their learning
+- If you address the learner by name, write ⟦LEARNER⟧ (exactly as shown) instead of a name
+
+Format the response as a clear, structured task description."""
+
+# Placeholder the model writes instead of the learner's name; filled in after generation so tasks can be shared.
+# A sentinel that doesn't occur in normal text or code (a Python task may well contain f"Hello {user_name}")
+USER_NAME_PLACEHOLDER = "⟦LEARNER⟧"
+
+# Client-wide bounds so a stalled OpenAI call can't pin a worker thread; the SDK retries
+# 429s/5xx/connection errors itself with exponential backoff, honouring Retry-After
+OPENAI_TIMEOUT = httpx.Timeout(20.0, connect=5.0)
+OPENAI_MAX_RETRIES = 3
+# Keep-alive pool for the shared OpenAI client: one connection per completion worker, plus one per roadmap call
+# (api.py runs at most ROADMAP_CONNECTIONS quiz submissions, and so roadmap calls, at once)
+ROADMAP_CONNECTIONS = 8
+OPENAI_LIMITS = httpx.Limits(max_connections=OPENAI_WORKERS + ROADMAP_CONNECTIONS, max_keepalive_connections=10)
+
+# Account limits for gpt-4o-mini; requests are paced under these instead of running into 429s
+OPENAI_MAX_REQUESTS_PER_MINUTE = 500
+OPENAI_MAX_TOKENS_PER_MINUTE = 200000
+
+# Completion budget for one generated task
+TASK_MAX_TOKENS = 400
+
+# Lower temperature for the structured task text (the n-variant requests still differ at this setting)
+TASK_TEMPERATURE = 0.5
+
+# Only the first non-blank roadmap lines go into the task prompt; the rest adds input tokens, not quality
+ROADMAP_PROMPT_LINES = 8
+
+# Per-request timeout for a task generation, and how long to wait for the first
+# streamed token before sending a second (hedge) request and taking whichever finishes first
+GENERATION_TIMEOUT_SECONDS = 15
+HEDGE_TIMEOUT_SECONDS = 10
+HEDGE_AFTER_SECONDS = 3
+
+# How long the admin user-name list is served from memory before re-querying
+USER_NAMES_TTL_SECONDS = 60
+# How long a user's task list is served from memory (any task write in this process drops it sooner), and how many users to keep
+USER_TASKS_TTL_SECONDS = 10
+USER_TASKS_CACHE_SIZE = 256
+
+# HTML body of the task assignment email, filled in with str.format_map (values are HTML-escaped first)
+TASK_EMAIL_TEMPLATE = """
+<html>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+        <h2 style="color: #2c3e50;">Hello {user_name}!</h2>
+        <p>You have been assigned a new learning task based on your quiz performance.</p>
+
+        <div style="background-color: #f8f9fa; border-left: 4px solid #007bff; padding: 15px; margin: 20px 0; border-radius: 5px;">
+            <h3 style="color: #007bff; margin-top: 0;">Task #{task_number}</h3>
+            <div style="white-space: pre-line;">{task_description}</div>
+        </div>
+
+        <div style="background-color: #e8f5e8; border: 1px solid #28a745; padding: 10px; border-radius: 5px; margin: 15px 0;">
+            <p style="margin: 0;"><strong>Due Date:</strong> {due_date}</p>
+        </div>
+
+        <p>To submit your task, please reply to this email with your work or use the submit button in the app.</p>
+
+        <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee;">
+            <p style="color: #666; font-size: 14px;">Keep up the great work!</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+# HTML body of the submission confirmation email (no per-user fields)
+SUBMISSION_EMAIL_BODY = """
+<html>
+<body>
+    <h2>Task Submission Confirmed!</h2>
+    <p>Your task has been successfully submitted and recorded.</p>
+    <p>We'll review your work and assign the next task soon.</p>
+    <p>Keep up the excellent progress!</p>
+</body>
+</html>
+"""
+
+# How long a generated task stays reusable for an identical prompt
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Size of sqlite3's per-connection compiled statement cache (default is 128)
+STATEMENT_CACHE_SIZE = 256
+
+# SQL used on hot paths. Keeping each statement as one constant means every call
+# sends identical text, so the pooled connection's statement cache always hits.
+# OR IGNORE: if a concurrent request already scheduled this (user_email, task_number), keep its row
+SQL_INSERT_TASK = """
+INSERT OR IGNORE INTO tasks (user_name, user_email, task_number, task_description, task_template, assigned_date, due_date, status)
+VALUES (?, ?, ?, ?, ?, ?, ?, 'scheduled')
+"""
+# One progress row per learner, created with their schedule so trg_tasks_completed has a row to bump; the count is seeded
+# from already completed tasks, so a schedule that predates the row starts at the right number
+SQL_INSERT_PROGRESS = """
+INSERT OR IGNORE INTO user_progress (user_name, user_email, level, tasks_completed)
+SELECT ?, ?, ?, COUNT(*) FROM tasks WHERE user_email = ? AND status = 'completed'
+"""
+# Task count plus the last scheduled row in one round trip (COUNT(*) OVER () is evaluated before LIMIT)
+SQL_SELECT_SCHEDULE_SUMMARY = """
+SELECT COUNT(*) OVER (), task_number, assigned_date, task_template FROM tasks
+WHERE user_email = ?
+ORDER BY task_number DESC LIMIT 1
+"""
+# Latest task that has actually been handed out (pre-created 'scheduled' rows don't count)
+SQL_SELECT_CURRENT_TASK = """
+SELECT task_number, status FROM tasks
+WHERE user_email = ? AND status != 'scheduled'
+ORDER BY task_number DESC LIMIT 1
+"""
+# Dates come from SQLite's clock (local time, matching the old datetime.now() values) in the same round trip
+SQL_ASSIGN_TASK = """
+UPDATE tasks SET assigned_date = DATE('now', 'localtime'), status = 'pending'
+WHERE user_email = ? AND task_number = ?
+RETURNING id, task_description, due_date
+"""
+SQL_COMPLETE_TASK = """
+UPDATE tasks
+SET status = 'completed', submitted_date = DATE('now', 'localtime'), submission_content = ?
+WHERE id = ? AND user_email = ?
+RETURNING id
+"""
+SQL_SELECT_USER_TASKS = """
+SELECT id, task_number, task_description AS description, assigned_date, due_date, status, submitted_date
+FROM tasks
+WHERE user_email = ?
+ORDER BY task_number
+"""
+SQL_SELECT_USER_NAMES = "SELECT DISTINCT name FROM users"
+SQL_SELECT_LLM_CACHE = "SELECT response FROM llm_cache WHERE hash = ? AND ts > ?"
+SQL_UPSERT_LLM_CACHE = "INSERT OR REPLACE INTO llm_cache (hash, response, ts) VALUES (?, ?, ?)"
+SQL_UPDATE_TASK_FILE = "UPDATE tasks SET submission_content = ? WHERE user_email = ? AND task_number = ?"
+SQL_SELECT_TASK_FILE = "SELECT submission_content FROM tasks WHERE user_email = ? AND task_number = ?"
+
+
+def task_day_offset(task_number: int) -> int:
+    """Days from task 1's date to this task's date on the Monday/Thursday cadence (+3, +4, +3, ...)"""
+    weeks, second_of_week = divmod(task_number - 1, 2)
+    return weeks * 7 + second_of_week * 3
+
+
+@lru_cache(maxsize=None)
+def get_openai_client(api_key: str):
+    """Return the process-wide OpenAI client for this key, so every caller shares one HTTP keep-alive pool"""
+    http_client = httpx.Client(timeout=OPENAI_TIMEOUT, limits=OPENAI_LIMITS) # One bounded connection pool, reused across calls
+    return OpenAI(api_key=api_key, timeout=OPENAI_TIMEOUT, max_retries=OPENAI_MAX_RETRIES, http_client=http_client)
+
+
+class RateLimiter: # Token buckets for requests/minute and tokens/minute, shared by every thread that calls OpenAI
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self._capacity = (float(requests_per_minute), float(tokens_per_minute))
+        self._available = list(self._capacity) # Start full so the first burst goes straight out
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int):
+        """Block until one more request of about `tokens` tokens fits under both per-minute limits"""
+        needed = (1.0, min(float(tokens), self._capacity[1])) # A huge request still gets out once the bucket is full
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed, self._updated = now - self._updated, now
+                for i, capacity in enumerate(self._capacity): # Refill continuously at capacity per 60 s
+                    self._available[i] = min(capacity, self._available[i] + elapsed * capacity / 60.0)
+                if all(self._available[i] >= needed[i] for i in range(2)):
+                    for i in range(2):
+                        self._available[i] -= needed[i]
+                    return
+                # Sleep just long enough for the scarcer bucket to refill
+                delay = max((needed[i] - self._available[i]) * 60.0 / self._capacity[i] for i in range(2))
+            time.sleep(delay)
+
+
+def estimate_tokens(messages, max_tokens: int, n: int = 1) -> int:
+    """Rough token cost of a chat request (about 4 characters per prompt token plus the completion budget)"""
+    return sum(len(message["content"]) for message in messages) // 4 + max_tokens * n
+
+
+OPENAI_LIMITER = RateLimiter(OPENAI_MAX_REQUESTS_PER_MINUTE, OPENAI_MAX_TOKENS_PER_MINUTE) # Process-wide, like the quota
+
+
+class ConnectionPool: # Process-wide pool of long-lived, pre-configured SQLite connections
+    def __init__(self, db_path: str, size: int = POOL_SIZE):
+        self.db_path = db_path
+        self._idle = queue.Queue(maxsize=size) # Connections waiting to be reused
+        self._local = threading.local() # The connection this thread currently holds, so nested acquires share it
+        self._write_lock = threading.RLock() # Serializes write transactions across threads
+
+    def _connect(self):
+        """Open a connection in autocommit mode and apply the pragmas once"""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.row_factory = sqlite3.Row # C-level rows that index like tuples and convert straight to dicts
+        return conn
+
+    @contextmanager
+    def acquire(self):
+        """Yield a pooled connection, returning it to the pool when the outermost block exits"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None: # Already held higher up this thread's stack (e.g. a transaction inside assign_task)
+            yield conn
+            return
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty: # Never block: a caller holding a connection may be waiting on workers that need one
+            conn = self._connect()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction: # Don't hand a half-finished transaction to the next caller
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full: # Pool already has enough idle connections
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Yield a connection inside BEGIN IMMEDIATE ... COMMIT, rolling back on error"""
+        with self._write_lock, self.acquire() as conn:
+            # IMMEDIATE takes the write lock up front, so reads inside the transaction can't be invalidated
+            # by another writer (api.py or a second worker process) before our UPDATE/INSERT runs
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+
+_POOL = ConnectionPool(DB_PATH) # Shared by every TaskManager; connections open lazily on first use
+
+_EMAIL_EXECUTOR = ThreadPoolExecutor(max_workers=EMAIL_WORKERS, thread_name_prefix="email") # Sends email off the request thread
+
+_OPENAI_EXECUTOR = ThreadPoolExecutor(max_workers=OPENAI_WORKERS, thread_name_prefix="openai") # Runs primary + hedge completions
+_OPENAI_SLOTS = threading.BoundedSemaphore(OPENAI_WORKERS) # One per worker, held from submit until the call is done
+
+
+def _submit_completion(fn, *args, blocking: bool = True):
+    """Run fn on the shared OpenAI pool and return its Future, or None if blocking is False and no worker is idle"""
+    # Taking a slot before submitting means a submitted call never sits in the executor's queue
+    if not _OPENAI_SLOTS.acquire(blocking=blocking):
+        return None
+    try:
+        future = _OPENAI_EXECUTOR.submit(fn, *args)
+    except BaseException:
+        _OPENAI_SLOTS.release()
+        raise
+    future.add_done_callback(lambda _: _OPENAI_SLOTS.release())
+    return future
+
+
+def get_conn():
+    """Context manager yielding a connection from the shared pool"""
+    return _POOL.acquire()
+
+
+def get_transaction():
+    """Context manager yielding a pooled connection inside BEGIN IMMEDIATE ... COMMIT"""
+    return _POOL.transaction()
+
+
+def setup_database(): # Create database tables if they do not exist
+    """Setup database tables for tasks, progress tracking and auth, once per process (safe from any thread)"""
+    global _SCHEMA_READY
+    if _SCHEMA_READY: # Fast path without the lock once the schema exists
+        return
+    with _SCHEMA_LOCK:
+        if _SCHEMA_READY: # Another thread finished it while we waited
+            return
+        _setup_schema()
+        _SCHEMA_READY = True
+
+
+def _setup_schema():
+    """Apply the journal mode and run the DDL"""
+    # WAL lets readers run alongside a writer. It is stored in the database file, so one
+    # init connection sets it for every later connection (user_learning.db-wal/-shm appear next to the db)
+    init_conn = sqlite3.connect(DB_PATH)
+    try:
+        init_conn.execute("PRAGMA journal_mode=WAL")
+    finally:
+        init_conn.close()
+    with _POOL.transaction() as conn: # Run all DDL in one transaction on the pooled connection
+        _create_tables(conn.cursor())
+
+
+def _create_tables(cursor):
+    """Create every table used by the app if it is missing"""
+    # Create a 'users' table for storing quiz results and user roadmap
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        score INTEGER,
+        level TEXT,
+        roadmap TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    # Lets SELECT DISTINCT name walk the index instead of sorting the whole table
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_name ON users(name)")
+
+    # Create auth_users table for application login/auth (if not exists)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS auth_users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL UNIQUE,
+        password_hash TEXT NOT NULL,
+        role TEXT NOT NULL CHECK(role IN ('user','admin')) DEFAULT 'user',
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    # Create tasks table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_name TEXT NOT NULL,
+        user_email TEXT NOT NULL,
+        task_number INTEGER NOT NULL,
+        task_description TEXT NOT NULL,
+        task_template TEXT,
+        assigned_date TEXT NOT NULL,
+        due_date TEXT NOT NULL,
+        status TEXT DEFAULT 'pending',
+        submitted_date TEXT,
+        submission_content TEXT
+    )
+    """)
+
+    # Name-free task text (placeholder still in it), so a backfilled follow-up can be prompted without the learner's name;
+    # databases created before the column existed get it here, and their older rows stay NULL
+    if "task_template" not in {row[1] for row in cursor.execute("PRAGMA table_info(tasks)").fetchall()}:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN task_template TEXT")
+
+    # Index the (user_email, task_number) lookups used by every task query; UNIQUE also prevents duplicate scheduling
+    try:
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_tasks_user_email_tasknum ON tasks(user_email, task_number)")
+    except sqlite3.IntegrityError:
+        # Older databases may already hold duplicate rows; still index the lookups without the constraint
+        print("Duplicate (user_email, task_number) rows found; creating a non-unique index instead.")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_user_email_tasknum ON tasks(user_email, task_number)")
+    
+    # Create user_progress table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_progress (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_name TEXT NOT NULL,
+        user_email TEXT NOT NULL,
+        quiz_score INTEGER,
+        level TEXT,
+        roadmap TEXT,
+        last_task_assigned TEXT,
+        tasks_completed INTEGER DEFAULT 0
+    )
+    """)
+    # submit_task bumps tasks_completed by user_email; without this it scans the table. UNIQUE makes
+    # SQL_INSERT_PROGRESS create at most one row per learner
+    try:
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_progress_user_email ON user_progress(user_email)")
+    except sqlite3.IntegrityError:
+        print("Duplicate user_progress rows found; creating a non-unique index instead.")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_progress_user_email ON user_progress(user_email)")
+    # Keep tasks_completed in step with task status inside SQLite, so submit_task is a single statement
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_tasks_completed
+    AFTER UPDATE OF status ON tasks
+    WHEN NEW.status = 'completed' AND OLD.status IS NOT 'completed'
+    BEGIN
+        UPDATE user_progress SET tasks_completed = tasks_completed + 1 WHERE user_email = NEW.user_email;
+    END
+    """)
+
+    # Create llm_cache table (generated task text keyed by a hash of its inputs)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        hash TEXT PRIMARY KEY,
+        response TEXT NOT NULL,
+        ts INTEGER NOT NULL
+    )
+    """)
 
-OPENAI_AVAILABLE = bool(openai_api_key)
-EMAIL_AVAILABLE = bool(email_password and email_address)
 
 class TaskManager: #Define a TaskManager class to handle tasks, database setup, and OpenAI integration
     def __init__(self, api_key: str): # Constructor method to initialize TaskManager with OpenAI API key
-        self.client = OpenAI(api_key=api_key) if api_key else None # Create an OpenAI client instance using the provided API key
-        self.setup_database() # Initialize and set up all required database tables
+        self.client = get_openai_client(api_key) if api_key else None # Shared OpenAI client for the provided API key
+        self._pool = _POOL # Reused SQLite connections, so calls don't pay for connect + pragma setup
+        self._smtp = None # Authenticated SMTP session shared by every send; opened lazily
+        self._user_names_cache = None # (fetched_at, names) for get_all_user_names
+        self._user_tasks_cache = {} # user_email -> (fetched_at, task dicts) for get_user_tasks
+        self._user_tasks_generation = 0 # Bumped on every task write, so a read that raced one isn't cached
+        self._user_tasks_lock = threading.Lock()
+        self._smtp_lock = threading.Lock() # smtplib.SMTP is not thread-safe, so mail workers take turns on it
+        self.setup_database() # Initialize and set up all required database tables (no-op after the first time)
     
     def setup_database(self): # Method to create database tables if they do not exist
-        """Setup database tables for tasks and progress tracking"""
-        conn = sqlite3.connect("user_learning.db") # Connect to (or create) the SQLite database file 'user_learning.db'
-        cursor = conn.cursor() 
-        
-        # Create a 'users' table for storing quiz results and user roadmap
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            score INTEGER,
-            level TEXT,
-            roadmap TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-
-        # Create auth_users table for application login/auth (if not exists)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS auth_users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT NOT NULL UNIQUE,
-            password_hash TEXT NOT NULL,
-            role TEXT NOT NULL CHECK(role IN ('user','admin')) DEFAULT 'user',
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-
-        # Create tasks table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_name TEXT NOT NULL,
-            user_email TEXT NOT NULL,
-            task_number INTEGER NOT NULL,
-            task_description TEXT NOT NULL,
-            assigned_date TEXT NOT NULL,
-            due_date TEXT NOT NULL,
-            status TEXT DEFAULT 'pending',
-            submitted_date TEXT,
-            submission_content TEXT
-        )
-        """)
-        
-        # Create user_progress table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_progress (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_name TEXT NOT NULL,
-            user_email TEXT NOT NULL,
-            quiz_score INTEGER,
-            level TEXT,
-            roadmap TEXT,
-            last_task_assigned TEXT,
-            tasks_completed INTEGER DEFAULT 0
-        )
-        """)
-        
-        conn.commit()# Save all changes to the database
-        conn.close() # Close the database connection
+        """Setup database tables for tasks and progress tracking (no-op after the first time)"""
+        setup_database()
     
-    def send_email(self, to_email: str, subject: str, body: str): # Method to send an email using SMTP protocol
-        """Send email using SMTP"""
+    def _send_email_blocking(self, to_email: str, subject: str, body: str): # Method to send an email using SMTP protocol
+        """Send email using SMTP (blocks on the network; runs on _EMAIL_EXECUTOR)"""
         try:
-            if not EMAIL_AVAILABLE:
+            settings = get_settings()
+            if not settings.email_available:
                 # Email configuration missing; skip sending and report False so callers can reflect this in UI
                 print("Email config not set; skipping email send.")
                 return False
             msg = MIMEMultipart('alternative')# Create a multipart email object that can hold both plain text and HTML
-            msg['From'] = email_address# Set the "From" field to the sender's email address
+            msg['From'] = settings.email_address# Set the "From" field to the sender's email address
             msg['To'] = to_email# Set the "To" field to the recipient's email address
             msg['Subject'] = subject# Set the subject of the email
             
@@ -104,17 +509,15 @@ class TaskManager: #Define a TaskManager class to handle tasks, database setup,
             html_part = MIMEText(body, 'html')# Create the HTML version of the email body
             msg.attach(html_part)  # Attach the HTML content to the email
             
-            # Create SMTP session
-            server = smtplib.SMTP('smtp.gmail.com', 587)# Connect to Gmail's SMTP server using port 587 for TLS
-            server.starttls()# Start TLS encryption for secure communication
-            
-            # Login to the server
-            server.login(email_address, email_password)# Login to the SMTP server using the sender's email and password
-            
-            # Send email
+            # Send email over the shared session (the connection stays open for the next email)
             text = msg.as_string() # Convert the email object to a string format ready for sending
-            server.sendmail(email_address, to_email, text)# Send the email from sender to recipient
-            server.quit()# Close the connection to the SMTP server
+            with self._smtp_lock:
+                try:
+                    self._get_smtp().sendmail(settings.email_address, to_email, text)# Send the email from sender to recipient
+                except smtplib.SMTPServerDisconnected:
+                    # The server dropped the idle session between our check and the send; log in again once
+                    self._smtp = None
+                    self._get_smtp().sendmail(settings.email_address, to_email, text)
             
             print(f"Email sent successfully to {to_email}")# Confirmation message in console
             return True
@@ -131,126 +534,288 @@ class TaskManager: #Define a TaskManager class to handle tasks, database setup,
         except Exception as e:  # General error handling for all other exceptions
             print(f"Email sending failed: {str(e)}")
             return False
+
+    def _get_smtp(self):
+        """Return the shared SMTP session, reconnecting if it has gone away (caller holds _smtp_lock)"""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250: # Cheap health check; Gmail drops idle sessions after a few minutes
+                    return self._smtp
+            except smtplib.SMTPException:
+                pass
+            self._close_smtp()
+        server = smtplib.SMTP('smtp.gmail.com', 587)# Connect to Gmail's SMTP server using port 587 for TLS
+        server.starttls()# Start TLS encryption for secure communication
+        settings = get_settings()
+        server.login(settings.email_address, settings.email_password)# Login to the SMTP server using the sender's email and password
+        self._smtp = server
+        return server
+
+    def _close_smtp(self):
+        """Close the shared SMTP session, ignoring errors from an already dead connection"""
+        server, self._smtp = self._smtp, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def shutdown(self):
+        """Deliver queued emails, then close the SMTP session and background threads (call once at app shutdown)"""
+        _EMAIL_EXECUTOR.shutdown(wait=True) # Let already queued emails go out before closing their session
+        with self._smtp_lock:
+            self._close_smtp()
+        _OPENAI_EXECUTOR.shutdown(wait=False, cancel_futures=True) # Abandon in-flight generations, don't block exit on them
+
+    def send_email_async(self, to_email: str, subject: str, body: str, task_id: int = None):
+        """Queue an email on the background executor; returns its Future, or None if email is not configured"""
+        if not get_settings().email_available:
+            print("Email config not set; skipping email send.")
+            return None
+        future = _EMAIL_EXECUTOR.submit(self._send_email_blocking, to_email, subject, body)
+        future.add_done_callback(lambda done: self._log_email_failure(done, to_email, task_id)) # Nobody waits on it, so log failures
+        return future
+
+    def _log_email_failure(self, future, to_email: str, task_id: int = None):
+        """Print a line for a queued email that was not delivered"""
+        if future.cancelled():
+            print(f"Email to {to_email} (task {task_id}) was cancelled at shutdown")
+        elif future.exception() is not None:
+            print(f"Error sending email to {to_email} (task {task_id}): {future.exception()}")
+        elif not future.result():
+            print(f"Email to {to_email} (task {task_id}) was not delivered")
     # Method to generate a personalized learning task using AI based on user's roadmap and progress
 
     def generate_task(self, user_name: str, level: str, roadmap: List[str], task_number: int, previous_task: str = None):
         """Generate AI-based task based on user's performance and roadmap"""
-        # Create the base prompt that will be sent to the AI model
-        if not self.client:
-            # Fallback task when OpenAI is not configured
-            intro = f"Initial task" if task_number == 1 else f"Follow-up task building on previous work"
-            basics = "\n".join([
-                "Learning Objectives:",
-                "- Practice core concepts from your roadmap",
-                "- Produce a small, tangible deliverable",
-                "Instructions:",
-                "- Pick one weak area from your roadmap and build a simple example",
-                "- Document what you learned in a short README",
-                "Why this matters:",
-                "- Consolidates fundamentals and prepares you for the next task",
-            ])
-            previous = f"\nPrevious Task: {previous_task}\n" if (task_number == 2 and previous_task) else ""
-            return (
-                f"{intro} for {user_name} at {level} level.\n"
-                f"Roadmap focus (excerpt):\n{chr(10).join(roadmap[:6])}\n"
-                f"{previous}"
-                f"{basics}\n"
-                f"Estimated time: 2-4 hours"
-            )
-        prompt = f"""
-        Generate a learning task for a user named {user_name} who is at {level} level.
-        
-        User's Learning Roadmap:
-        {chr(10).join(roadmap)}
-        
-        Task Number: {task_number}
-        """
-        
+        return self._personalize(self._task_template(level, roadmap, task_number, previous_task), user_name)
+
+    def _task_template(self, level: str, roadmap: List[str], task_number: int, previous_task: str = None):
+        """Return the name-free text for one task: a completion when OpenAI is configured, the fallback text otherwise"""
+        if self.client:
+            return self._generate_task_text(level, roadmap, task_number, previous_task)
+        # Fallback task when OpenAI is not configured
+        intro = f"Initial task" if task_number == 1 else f"Follow-up task building on previous work"
+        basics = "\n".join([
+            "Learning Objectives:",
+            "- Practice core concepts from your roadmap",
+            "- Produce a small, tangible deliverable",
+            "Instructions:",
+            "- Pick one weak area from your roadmap and build a simple example",
+            "- Document what you learned in a short README",
+            "Why this matters:",
+            "- Consolidates fundamentals and prepares you for the next task",
+        ])
+        previous = f"\nPrevious Task: {previous_task}\n" if (task_number == 2 and previous_task) else ""
+        return (
+            f"{intro} for {USER_NAME_PLACEHOLDER} at {level} level.\n"
+            f"Roadmap focus (excerpt):\n{chr(10).join(roadmap[:6])}\n"
+            f"{previous}"
+            f"{basics}\n"
+            f"Estimated time: 2-4 hours"
+        )
+
+    def _generate_task_text(self, level: str, roadmap: List[str], task_number: int, previous_task: str = None):
+        """Return the name-free task text for these inputs, from the cache or a fresh completion"""
+        # Identical inputs produce an identical prompt, so reuse a recent answer instead of calling OpenAI again
+        # (the prompt carries no user name, so users at the same stage of the same roadmap share it)
+        cache_key = self._task_cache_key(level, roadmap, task_number, previous_task)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+
+        messages = self._task_messages(level, roadmap, task_number, previous_task)
+        task_text = self._hedged_completion(messages).strip() # Generated task text, extra spaces removed
+        self._store_cached_response(cache_key, task_text)
+        return task_text
+
+    def _personalize(self, task_text: str, user_name: str):
+        """Put the learner's name wherever the model wrote the placeholder"""
+        return task_text.replace(USER_NAME_PLACEHOLDER, user_name)
+
+    def _task_messages(self, level: str, roadmap: List[str], task_number: int, previous_task: str = None):
+        """Build the chat messages for one task prompt"""
+        # Only the variable, per-user context goes in the user message (after the cached system prefix)
         if task_number == 2 and previous_task:# If this is the second task and there was a previous task, create a follow-up task prompt
-            prompt += f"""
-            Previous Task: {previous_task}
-            
-            Generate a follow-up task that builds upon the previous task and continues the learning journey.
-            """
+            instruction = f"Previous Task: {previous_task}\n\nGenerate a follow-up task that builds upon the previous task and continues the learning journey."
         else:  # Otherwise, create an initial task prompt for starting the learning journey
-            prompt += """
-            Generate an initial task that helps the user start their learning journey based on their roadmap.
-            """
-        # Add detailed requirements for the AI-generated task to ensure clarity and usefulness
-        prompt += """
-        Requirements:
-        - Task should be practical and hands-on
-        - Include specific learning objectives
-        - Provide clear instructions
-        - Suggest resources or tools if needed
-        - Make it achievable within 3-4 days
-        - Include a brief explanation of why this task is important for their learning
-        
-        Format the response as a clear, structured task description.
-        """
-        
-        response = self.client.chat.completions.create( # Send the constructed prompt to the OpenAI GPT-4o model for task generation
+            instruction = "Generate an initial task that helps the user start their learning journey based on their roadmap."
+        prompt = (
+            f"Generate a learning task for a user who is at {level} level.\n\n"
+            f"User's Learning Roadmap:\n{chr(10).join(self._roadmap_excerpt(roadmap))}\n\n"
+            f"Task Number: {task_number}\n\n"
+            f"{instruction}"
+        )
+        return [
+            {"role": "system", "content": TASK_SYSTEM_PROMPT}, # Static instructions and requirements (stable prefix)
+            {"role": "user", "content": prompt}  # User's actual prompt with details
+        ]
+
+    def _roadmap_excerpt(self, roadmap: List[str]):
+        """Return the first ROADMAP_PROMPT_LINES non-blank roadmap lines"""
+        return list(itertools.islice((line for line in roadmap if line.strip()), ROADMAP_PROMPT_LINES))
+
+    def _stream_completion(self, client, messages, first_token=None, started=None):
+        """Stream a task completion and return the full text; sets started when the request goes out and first_token when output starts"""
+        OPENAI_LIMITER.acquire(estimate_tokens(messages, TASK_MAX_TOKENS)) # Wait for RPM/TPM headroom
+        if started is not None:
+            started.set()
+        stream = client.chat.completions.create( # Send the constructed prompt to the OpenAI GPT-4o model for task generation
             model="gpt-4o-mini", # Using OpenAI's GPT-4o model for better reasoning and text generation
-            messages=[
-                {"role": "system", "content": "You are an expert learning coach that creates personalized, practical learning tasks."},
-                {"role": "user", "content": prompt}  # User's actual prompt with details
-            ],
-            temperature=0.7, # Adds creativity to the task generation
-            max_tokens=500 # Limit the response length to 500 tokens
+            messages=messages,
+            temperature=TASK_TEMPERATURE, # Some variety without wandering off the structure
+            max_tokens=TASK_MAX_TOKENS, # Limit the response length
+            stream=True, # Receive tokens as they are produced instead of one response at the end
         )
-        
-        return response.choices[0].message.content.strip() # Extract the generated task text from the AI response, remove extra spaces, and return it
+        parts = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if first_token is not None:
+                    first_token.set()
+                parts.append(delta)
+        return "".join(parts)
+
+    def _hedged_completion(self, messages):
+        """Return the first successful completion, hedging with a second request if the first one stalls"""
+        started, first_token = threading.Event(), threading.Event()
+        primary = _submit_completion(
+            self._stream_completion, self.client.with_options(timeout=GENERATION_TIMEOUT_SECONDS), messages, first_token, started
+        )
+        primary.add_done_callback(lambda _: started.set()) # Don't wait forever on a call that failed or was cancelled first
+        # The hedge timer starts when the HTTP request does, so time spent waiting for a worker or for rate-limit headroom isn't a stall
+        started.wait()
+        # Most requests start streaming quickly; only a stalled one gets a hedge request
+        if first_token.wait(HEDGE_AFTER_SECONDS) or primary.done():
+            return primary.result()
+        # Only hedge onto an idle worker: when every worker is busy the system is saturated, and a hedge would just double the load
+        hedge = _submit_completion(
+            self._stream_completion, self.client.with_options(timeout=HEDGE_TIMEOUT_SECONDS), messages, blocking=False
+        )
+        if hedge is None:
+            return primary.result()
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result() # The slower request finishes in the background and is discarded
+        return primary.result() # Both failed; surface the primary request's error
+
+    def _task_cache_key(self, level: str, roadmap: List[str], task_number: int, previous_task: str = None):
+        """Hash every input that ends up in the task prompt"""
+        payload = {
+            "level": level,
+            "roadmap": self._roadmap_excerpt(roadmap), # Only the part that reaches the prompt
+            "task_number": task_number,
+            "prev": previous_task if task_number == 2 else None, # Only task 2 puts the previous task in the prompt
+            "placeholder": USER_NAME_PLACEHOLDER, # Texts stored under an older placeholder are never reused
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _get_cached_response(self, cache_key: str):
+        """Return a cached response younger than LLM_CACHE_TTL_SECONDS, or None"""
+        with self._pool.acquire() as conn:
+            row = conn.execute(SQL_SELECT_LLM_CACHE, (cache_key, int(time.time()) - LLM_CACHE_TTL_SECONDS)).fetchone()
+        return row[0] if row else None
+
+    def _store_cached_response(self, cache_key: str, response: str):
+        """Remember a generated response under cache_key"""
+        with self._pool.acquire() as conn:
+            conn.execute(SQL_UPSERT_LLM_CACHE, (cache_key, response, int(time.time())))
     
+    def generate_tasks(self, user_name: str, level: str, roadmap: List[str], task_numbers: List[int], previous_task: str = None):
+        """Generate several tasks concurrently and return them in task_numbers order"""
+        return [self._personalize(text, user_name) for text in self.generate_task_templates(level, roadmap, task_numbers, previous_task)]
+
+    def generate_task_templates(self, level: str, roadmap: List[str], task_numbers: List[int], previous_task: str = None):
+        """Generate several name-free tasks concurrently and return them in task_numbers order (previous_task must be name-free too)"""
+        # _task_template only reads previous_task for task 2 (the follow-up to task 1), so that is the
+        # only pair that has to be chained; every other request is independent and runs in parallel.
+        # Task 2 follows task 1's text with the placeholder still in it, so prompts and cache keys stay name-free
+        task_numbers = list(task_numbers)
+        if not task_numbers:
+            return []
+        if not self.client: # Fallback text is cheap and deterministic; build it in order
+            texts = {}
+            for tn in task_numbers:
+                previous = texts.get(1, previous_task) if tn == 2 else None
+                texts[tn] = self._task_template(level, roadmap, tn, previous)
+            return [texts[tn] for tn in task_numbers]
+        with ThreadPoolExecutor(max_workers=min(MAX_GENERATION_WORKERS, len(task_numbers))) as executor:
+            futures = {}
+            for tn in task_numbers:
+                if tn == 2 and 1 in futures: # Submitted after task 1, so it can't starve it of a worker
+                    futures[tn] = executor.submit(lambda: self._generate_task_text(level, roadmap, 2, futures[1].result()))
+                else:
+                    futures[tn] = executor.submit(self._generate_task_text, level, roadmap, tn, previous_task if tn == 2 else None)
+            return [futures[tn].result() for tn in task_numbers]
+
+    def generate_tasks_bulk(self, specs: List[Tuple[str, str, List[str], int, Optional[str]]]) -> List[str]:
+        """Generate one task per (user_name, level, roadmap, task_number, previous_task) spec, in spec order"""
+        specs = [tuple(spec) for spec in specs]
+        if not specs:
+            return []
+        if not self.client: # Fallback text is cheap and deterministic; no batching needed
+            return [self.generate_task(*spec) for spec in specs]
+        # Specs that produce the same prompt share one request that asks for n completions
+        groups = {}
+        for index, spec in enumerate(specs):
+            groups.setdefault(self._task_cache_key(*spec[1:]), []).append(index) # Name isn't part of the prompt
+        results = [None] * len(specs)
+        with ThreadPoolExecutor(max_workers=min(MAX_GENERATION_WORKERS, len(groups))) as executor:
+            futures = {
+                executor.submit(self._generate_task_group, specs[indexes[0]][1:], len(indexes)): indexes
+                for indexes in groups.values()
+            }
+            for future, indexes in futures.items():
+                for index, text in zip(indexes, future.result()):
+                    results[index] = self._personalize(text, specs[index][0])
+        return results
+
+    def _generate_task_group(self, prompt_spec, count: int):
+        """Return count name-free task texts for one (level, roadmap, task_number, previous_task), using n=count when count > 1"""
+        if count == 1:
+            return [self._generate_task_text(*prompt_spec)] # Cache + streaming/hedging path
+        messages = self._task_messages(*prompt_spec)
+        OPENAI_LIMITER.acquire(estimate_tokens(messages, TASK_MAX_TOKENS, count))
+        response = self.client.with_options(timeout=GENERATION_TIMEOUT_SECONDS).chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages,
+            temperature=TASK_TEMPERATURE, # Keeps the n variants different from each other
+            max_tokens=TASK_MAX_TOKENS,
+            n=count, # One round trip and one copy of the input tokens for every identical spec
+        )
+        texts = [choice.message.content.strip() for choice in response.choices]
+        self._store_cached_response(self._task_cache_key(*prompt_spec), texts[0])
+        return [texts[i % len(texts)] for i in range(count)] # Guard against fewer choices than requested
+
     def create_learning_schedule(self, user_name: str, user_email: str, level: str, roadmap: List[str], duration_weeks: int, total_tasks: int):
         """Create a complete learning schedule with tasks spread over the specified duration"""
         try:
-            conn = sqlite3.connect("user_learning.db")
-            cursor = conn.cursor()
+            # Calculate task schedule (twice a week): the first task falls on the next Monday
+            # (or today if it's Monday), then every task sits at a fixed offset on the Mon/Thu cadence
+            today = datetime.now().date()
+            first_monday = today + timedelta(days=(7 - today.weekday()) % 7)
             
-            # Calculate task schedule (twice a week)
-            start_date = datetime.now()
-            task_dates = []
+            # Generate tasks for the entire schedule (no DB lock held while the requests run)
+            templates = self.generate_task_templates(level, roadmap, range(1, total_tasks + 1))
+            rows = []
+            for task_number, task_template in enumerate(templates, start=1):
+                # Task date straight from its number; due date is 3 days after it
+                offset = task_day_offset(task_number)
+                task_date = first_monday + timedelta(days=offset)
+                due_date = first_monday + timedelta(days=offset + 3)
+                rows.append((user_name, user_email, task_number, self._personalize(task_template, user_name), task_template, task_date.isoformat(), due_date.isoformat()))
             
-            # Generate dates for tasks (twice a week)
-            current_date = start_date
-            task_count = 0
-            
-            while task_count < total_tasks:
-                # Add two tasks per week (e.g., Monday and Thursday)
-                if task_count % 2 == 0:  # First task of the week
-                    # Move to next Monday (or today if it's Monday)
-                    days_until_monday = (7 - current_date.weekday()) % 7
-                    if days_until_monday == 0 and task_count == 0:
-                        days_until_monday = 0  # Start today if it's Monday
-                    else:
-                        days_until_monday = days_until_monday if days_until_monday > 0 else 7
-                    current_date = current_date + timedelta(days=days_until_monday)
-                else:  # Second task of the week
-                    # Move to Thursday (3 days after Monday)
-                    current_date = current_date + timedelta(days=3)
-                
-                task_dates.append(current_date)
-                task_count += 1
-            
-            # Generate tasks for the entire schedule
-            previous_task = None
-            for task_number in range(1, total_tasks + 1):
-                # Generate task description
-                task_description = self.generate_task(user_name, level, roadmap, task_number, previous_task)
-                previous_task = task_description
-                
-                # Calculate due date (3 days after task date)
-                task_date = task_dates[task_number - 1]
-                due_date = task_date + timedelta(days=3)
-                
-                # Insert task into database
-                cursor.execute("""
-                INSERT INTO tasks (user_name, user_email, task_number, task_description, assigned_date, due_date, status)
-                VALUES (?, ?, ?, ?, ?, ?, 'scheduled')
-                """, (user_name, user_email, task_number, task_description, task_date.strftime("%Y-%m-%d"), due_date.strftime("%Y-%m-%d")))
-            
-            conn.commit()
-            conn.close()
+            # Insert the whole schedule in one transaction (one commit instead of one per task)
+            with self._pool.transaction() as conn:
+                conn.executemany(SQL_INSERT_TASK, rows)
+                conn.execute(SQL_INSERT_PROGRESS, (user_name, user_email, level, user_email)) # Same commit as the schedule
+            self.clear_user_tasks_cache()
             return True
             
         except Exception as e:
@@ -259,41 +824,30 @@ class TaskManager: #Define a TaskManager class to handle tasks, database setup,
     
     def assign_task(self, user_name: str, user_email: str, level: str, roadmap: List[str], duration_weeks: int = 4):# Method to assign a new learning task to a user
         """Assign a new task to the user"""
-        conn = sqlite3.connect("user_learning.db")# Connect to the SQLite database
-        cursor = conn.cursor()# Create a cursor object to run SQL queries
-        
-        # Check if this is the first task assignment for this user
-        cursor.execute("""
-        SELECT COUNT(*) FROM tasks WHERE user_email = ?
-        """, (user_email,))
-        
-        task_count = cursor.fetchone()[0]
-        
-        # If this is the first task, create the complete schedule
-        if task_count == 0:
-            total_tasks = duration_weeks * 2  # Tasks twice a week
-            schedule_created = self.create_learning_schedule(user_name, user_email, level, roadmap, duration_weeks, total_tasks)
-            if not schedule_created:
-                return {
-                    "error": True,
-                    "message": "Failed to create learning schedule."
-                }
-        else:
-            # Existing user: ensure the remaining schedule up to duration_weeks*2 exists
-            # Determine how many tasks the user should have in total
-            total_tasks = duration_weeks * 2
-            # Find current max task_number and its assigned_date to continue cadence
-            cursor.execute(
-                """
-                SELECT task_number, assigned_date FROM tasks
-                WHERE user_email = ?
-                ORDER BY task_number DESC LIMIT 1
-                """,
-                (user_email,)
-            )
+        with self._pool.acquire() as conn: # Borrow a connection from the shared pool
+            cursor = conn.cursor()# Create a cursor object to run SQL queries
+            
+            # Task count and the last scheduled task (number, date, description) in one query
+            cursor.execute(SQL_SELECT_SCHEDULE_SUMMARY, (user_email,))
             last_row = cursor.fetchone()
-            if last_row:
-                last_task_number_existing, last_assigned_date_str = last_row
+            task_count = last_row[0] if last_row else 0
+            
+            # If this is the first task, create the complete schedule
+            if task_count == 0:
+                total_tasks = duration_weeks * 2  # Tasks twice a week
+                schedule_created = self.create_learning_schedule(user_name, user_email, level, roadmap, duration_weeks, total_tasks)
+                if not schedule_created:
+                    return {
+                        "error": True,
+                        "message": "Failed to create learning schedule."
+                    }
+            else:
+                # Existing user: ensure the remaining schedule up to duration_weeks*2 exists
+                # Determine how many tasks the user should have in total
+                total_tasks = duration_weeks * 2
+                # Current max task_number, its assigned_date (to continue cadence) and name-free text (follow-up context;
+                # NULL for rows stored before task_template existed, and then the follow-up is prompted without it)
+                _, last_task_number_existing, last_assigned_date_str, previous_task_template = last_row
                 # Backfill only if fewer than total_tasks exist
                 if last_task_number_existing < total_tasks:
                     # Determine starting date for the next task
@@ -302,138 +856,90 @@ class TaskManager: #Define a TaskManager class to handle tasks, database setup,
                     except Exception:
                         last_date = datetime.now()
 
-                    # Cadence: +3 days (Mon->Thu), then +4 days (Thu->Mon), alternating
-                    # If last task number is odd, next jump is +3; if even, next jump is +4
-                    next_date = last_date + timedelta(days=(3 if (last_task_number_existing % 2 == 1) else 4))
-
-                    previous_task_text = None
-                    # Fetch last task description to seed follow-up context
-                    cursor.execute(
-                        """
-                        SELECT task_description FROM tasks
-                        WHERE user_email = ? AND task_number = ?
-                        """,
-                        (user_email, last_task_number_existing)
-                    )
-                    prev = cursor.fetchone()
-                    if prev and prev[0]:
-                        previous_task_text = prev[0]
-
-                    for tn in range(last_task_number_existing + 1, total_tasks + 1):
-                        # Generate new scheduled task content
-                        task_description = self.generate_task(user_name, level, roadmap, tn, previous_task_text)
-                        previous_task_text = task_description
+                    # Cadence: +3 days (Mon->Thu), then +4 days (Thu->Mon), alternating;
+                    # each new task's date is its offset relative to the last existing task
+                    last_offset = task_day_offset(last_task_number_existing)
 
+                    # Generate new scheduled task content concurrently
+                    new_task_numbers = range(last_task_number_existing + 1, total_tasks + 1)
+                    templates = self.generate_task_templates(level, roadmap, new_task_numbers, previous_task_template)
+                    rows = []
+                    for tn, task_template in zip(new_task_numbers, templates):
+                        next_date = last_date + timedelta(days=task_day_offset(tn) - last_offset)
                         due_date = next_date + timedelta(days=3)
 
-                        cursor.execute(
-                            """
-                            INSERT INTO tasks (user_name, user_email, task_number, task_description, assigned_date, due_date, status)
-                            VALUES (?, ?, ?, ?, ?, ?, 'scheduled')
-                            """,
-                            (
-                                user_name,
-                                user_email,
-                                tn,
-                                task_description,
-                                next_date.strftime("%Y-%m-%d"),
-                                due_date.strftime("%Y-%m-%d"),
-                            ),
-                        )
-                        # Advance cadence: alternate +3 then +4 days
-                        next_date = next_date + timedelta(days=(3 if (tn % 2 == 1) else 4))
-        
-        # Check if the user already has any tasks assigned
-        cursor.execute("""
-        SELECT task_number, task_description, status FROM tasks 
-        WHERE user_email = ? ORDER BY task_number DESC LIMIT 1
-        """, (user_email,))
-        
-        result = cursor.fetchone()# Get the most recent task record for the user (if any)
-        
-        # If the user has no previous tasks, assign Task 1
-        if not result:
-            task_number = 1
-            previous_task = None
-        else:
-            last_task_number, last_task_description, last_task_status = result# Extract last task details
+                        rows.append((
+                            user_name,
+                            user_email,
+                            tn,
+                            self._personalize(task_template, user_name),
+                            task_template,
+                            next_date.strftime("%Y-%m-%d"),
+                            due_date.strftime("%Y-%m-%d"),
+                        ))
+
+                    with self._pool.transaction(): # Backfilled rows are committed together
+                        cursor.executemany(SQL_INSERT_TASK, rows)
+                        cursor.execute(SQL_INSERT_PROGRESS, (user_name, user_email, level, user_email)) # Schedules from before progress rows existed
+                    self.clear_user_tasks_cache()
             
-            # Only assign next task if current task is completed
-            if last_task_status != 'completed':# If the last assigned task is not completed, don't assign a new task yet
-                return {
-                    "error": True,
-                    "message": f"Task {last_task_number} must be completed before the next task can be assigned. Please submit your current task first."
-                }
+            # Read the current task and mark the next one assigned in one write transaction, so two
+            # concurrent requests can't both see the same completed task and assign its successor twice
+            with self._pool.transaction():
+                # Check if the user already has any tasks assigned
+                cursor.execute(SQL_SELECT_CURRENT_TASK, (user_email,))
             
-            task_number = last_task_number + 1 # Otherwise, increment the task number and store the last task description
-            previous_task = last_task_description
+                result = cursor.fetchone()# Get the most recently assigned task for the user (if any)
             
-            # Check if we've reached the end of the schedule
-            total_tasks = duration_weeks * 2
-            if task_number > total_tasks:
+                # If the user has no previous tasks, assign Task 1
+                if not result:
+                    task_number = 1
+                else:
+                    last_task_number, last_task_status = result# Extract last task details
+                
+                    # Only assign next task if current task is completed
+                    if last_task_status != 'completed':# If the last assigned task is not completed, don't assign a new task yet
+                        return {
+                            "error": True,
+                            "message": f"Task {last_task_number} must be completed before the next task can be assigned. Please submit your current task first."
+                        }
+                
+                    task_number = last_task_number + 1 # Otherwise, move on to the next task number
+                
+                    # Check if we've reached the end of the schedule
+                    total_tasks = duration_weeks * 2
+                    if task_number > total_tasks:
+                        return {
+                            "error": True,
+                            "message": "You have completed all tasks in your learning journey. Great job!"
+                        }
+            
+                # Mark the pre-created task as assigned and read back its id, description and due date in one statement
+                cursor.execute(SQL_ASSIGN_TASK, (user_email, task_number))
+                task_data = cursor.fetchall() # Drain the RETURNING rows so the UPDATE finishes before COMMIT
+            
+            if task_data:
+                self.clear_user_tasks_cache()
+            if not task_data:
                 return {
                     "error": True,
-                    "message": "You have completed all tasks in your learning journey. Great job!"
+                    "message": f"Task {task_number} not found in schedule."
                 }
-        
-        # Get the pre-created task from the database
-        cursor.execute("""
-        SELECT task_description, due_date FROM tasks 
-        WHERE user_email = ? AND task_number = ?
-        """, (user_email, task_number))
-        
-        task_data = cursor.fetchone()
-        if not task_data:
-            return {
-                "error": True,
-                "message": f"Task {task_number} not found in schedule."
-            }
-        
-        task_description, due_date = task_data
-        
-        # Update task status to assigned
-        cursor.execute("""
-        UPDATE tasks SET assigned_date = ?, status = 'pending' WHERE user_email = ? AND task_number = ?
-        """, (datetime.now().strftime("%Y-%m-%d"), user_email, task_number))
-        
-        # Get the task ID
-        cursor.execute("""
-        SELECT id FROM tasks WHERE user_email = ? AND task_number = ?
-        """, (user_email, task_number))
-        
-        task_id = cursor.fetchone()[0] # Get the task ID
-        conn.commit() # Commit the changes to the database
-        conn.close() # Close the database connection
+            
+            task_id, task_description, due_date = task_data[0]
         
         # Create the subject line for the task assignment email
         subject = f"New Learning Task #{task_number} - {user_name}" # Create the HTML-formatted body of the email containing the task details
-        body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #2c3e50;">Hello {user_name}!</h2>
-                <p>You have been assigned a new learning task based on your quiz performance.</p>
-                
-                <div style="background-color: #f8f9fa; border-left: 4px solid #007bff; padding: 15px; margin: 20px 0; border-radius: 5px;">
-                    <h3 style="color: #007bff; margin-top: 0;">Task #{task_number}</h3>
-                    <div style="white-space: pre-line;">{task_description}</div>
-                </div>
-                
-                <div style="background-color: #e8f5e8; border: 1px solid #28a745; padding: 10px; border-radius: 5px; margin: 15px 0;">
-                    <p style="margin: 0;"><strong>Due Date:</strong> {due_date}</p>
-                </div>
-                
-                <p>To submit your task, please reply to this email with your work or use the submit button in the app.</p>
-                
-                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee;">
-                    <p style="color: #666; font-size: 14px;">Keep up the great work!</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        body = TASK_EMAIL_TEMPLATE.format_map({ # Fill the prebuilt HTML body with the task details
+            # Escape user input and LLM output so markup in them can't inject HTML into the email
+            "user_name": html.escape(user_name),
+            "task_number": task_number,
+            "task_description": html.escape(task_description),
+            "due_date": html.escape(str(due_date)),
+        })
         
-        email_sent = self.send_email(user_email, subject, body) # Send the task assignment email to the user
+        # Queue the task assignment email; email_sent=True means it is on its way
+        email_sent = self.send_email_async(user_email, subject, body, task_id) is not None
         
         return { # Return a dictionary with task details and whether the email was sent
             "task_id": task_id,
@@ -446,113 +952,104 @@ class TaskManager: #Define a TaskManager class to handle tasks, database setup,
     
     def submit_task(self, user_email: str, task_id: int, submission_content: str): # Method to submit a completed task for a given user
         """Submit a completed task"""
-        conn = sqlite3.connect("user_learning.db")# Connect to the SQLite database
-        cursor = conn.cursor() # Create a cursor object to execute SQL commands
-        
-        # Update task status
-        submitted_date = datetime.now().strftime("%Y-%m-%d")# Get the current date for submission record
-        cursor.execute("""
-        UPDATE tasks 
-        SET status = 'completed', submitted_date = ?, submission_content = ?
-        WHERE id = ? AND user_email = ?
-        """, (submitted_date, submission_content, task_id, user_email))# Update the task status to 'completed' and store the submission content
+        with self._pool.acquire() as conn: # One statement: trg_tasks_completed bumps user_progress in the same implicit transaction
+            # Update the task status to 'completed' and store the submission content; RETURNING tells us in the
+            # same statement whether the task exists and belongs to the user
+            updated = bool(conn.execute(SQL_COMPLETE_TASK, (submission_content, task_id, user_email)).fetchall())
         
-        if cursor.rowcount > 0:# Check if the update affected any rows (ensures the task exists and belongs to the user)
-            # Update user progress
-            cursor.execute("""
-            UPDATE user_progress 
-            SET tasks_completed = tasks_completed + 1
-            WHERE user_email = ?
-            """, (user_email,))# Increment the user's "tasks_completed" count in the progress table
-            
-            conn.commit()
-            conn.close()
-            
-            # Prepare the confirmation email subject.# Prepare the HTML-formatted confirmation email body
+        if updated:
+            self.clear_user_tasks_cache() # Status and submitted_date changed
+            # Prepare the confirmation email subject and body
             subject = "Task Submission Confirmed"
-            body = f"""
-            <html>
-            <body>
-                <h2>Task Submission Confirmed!</h2>
-                <p>Your task has been successfully submitted and recorded.</p>
-                <p>We'll review your work and assign the next task soon.</p>
-                <p>Keep up the excellent progress!</p>
-            </body>
-            </html>
-            """
+            body = SUBMISSION_EMAIL_BODY # Static HTML confirmation body
             
-            self.send_email(user_email, subject, body) # Send the confirmation email to the user
+            self.send_email_async(user_email, subject, body, task_id) # Queue the confirmation email to the user
             
             return {"success": True, "message": "Task submitted successfully!"}# Return success response
         else:
-            conn.close()# Close database connection if no matching task was found or it’s already submitted
             return {"success": False, "message": "Task not found or already submitted."}# Return failure response
     
     def get_user_tasks(self, user_email: str):# Method to fetch all tasks assigned to a specific user
         """Get all tasks for a user"""
-        conn = sqlite3.connect("user_learning.db")# Connect to the SQLite database
-        cursor = conn.cursor()# Create a cursor to execute SQL queries
-        
-        cursor.execute("""
-        SELECT id, task_number, task_description, assigned_date, due_date, status, submitted_date
-        FROM tasks 
-        WHERE user_email = ? 
-        ORDER BY task_number
-        """, (user_email,))  # Retrieve all tasks for the given user email, ordered by task number
-        
-        tasks = cursor.fetchall()# Fetch all rows from the executed query
-        conn.close()# Close the database connection
-        
-        return [# Convert raw task tuples into a list of dictionaries for easier use in the app
-            {
-                "id": task[0], # Unique task ID
-                "task_number": task[1], # Sequential task number
-                "description": task[2],  # Task details/description
-                "assigned_date": task[3], # Date the task was assigned
-                "due_date": task[4], # Task deadline
-                "status": task[5], # Current status (pending/completed)
-                "submitted_date": task[6] # Date the task was submitted (if any)
-            }
-            for task in tasks
-        ]
+        with self._user_tasks_lock:
+            cached = self._user_tasks_cache.get(user_email)
+            generation = self._user_tasks_generation
+        if cached and time.monotonic() - cached[0] < USER_TASKS_TTL_SECONDS: # Repeat views within the TTL skip the query
+            return [dict(task) for task in cached[1]] # Fresh dicts, so callers can't modify the cached rows
+        with self._pool.acquire() as conn: # Borrow a connection from the shared pool
+            # Column names in SQL_SELECT_USER_TASKS are the dict keys the app expects
+            # (id, task_number, description, assigned_date, due_date, status, submitted_date)
+            tasks = [dict(task) for task in conn.execute(SQL_SELECT_USER_TASKS, (user_email,))]
+        with self._user_tasks_lock:
+            if generation == self._user_tasks_generation: # No task write happened while we were reading
+                if len(self._user_tasks_cache) >= USER_TASKS_CACHE_SIZE and user_email not in self._user_tasks_cache:
+                    del self._user_tasks_cache[next(iter(self._user_tasks_cache))] # Evict the oldest entry
+                self._user_tasks_cache.pop(user_email, None) # Re-insert at the end, as the newest
+                self._user_tasks_cache[user_email] = (time.monotonic(), tasks)
+        return [dict(task) for task in tasks]
 
     def get_all_user_names(self): # Method to fetch all distinct user names from the users table
         """Fetch all unique user names from the users table."""
-        conn = sqlite3.connect("user_learning.db")# Connect to the SQLite database
-        cursor = conn.cursor()# Create a cursor to execute SQL queries
-        cursor.execute("SELECT DISTINCT name FROM users")# Select distinct names to avoid duplicates
-        names = [row[0] for row in cursor.fetchall()]# Convert the list of tuples into a flat list of names
-        conn.close()# Close the database connection
-        return names
+        cached = self._user_names_cache
+        if cached and time.monotonic() - cached[0] < USER_NAMES_TTL_SECONDS: # The name list changes rarely, serve it from memory
+            return list(cached[1])
+        with self._pool.acquire() as conn: # Borrow a connection from the shared pool
+            cursor = conn.cursor()# Create a cursor to execute SQL queries
+            cursor.execute(SQL_SELECT_USER_NAMES)# Select distinct names to avoid duplicates
+            names = list(itertools.chain.from_iterable(cursor))# Flatten the one-column rows into a list of names, straight off the cursor
+        self._user_names_cache = (time.monotonic(), names)
+        return list(names)
+
+    def clear_user_tasks_cache(self):
+        """Drop every cached task list; call after inserting, updating or deleting tasks rows"""
+        with self._user_tasks_lock:
+            self._user_tasks_generation += 1
+            self._user_tasks_cache.clear()
+
+    def clear_user_names_cache(self):
+        """Drop the cached user names; call after inserting or deleting users rows"""
+        self._user_names_cache = None
 
     def save_task_file(self, user_email: str, task_number: int, file_path: str):# Method to save a file uploaded for a user's task and update the database record
-        """Save uploaded file for a user's task. Store file path in tasks table."""
+        """Move an uploaded file into the user's task folder. Store file path in tasks table."""
         # Ensure upload directory exists
         upload_dir = os.path.join("uploads", user_email, f"task_{task_number}")# Build the directory path where the uploaded file will be stored
         os.makedirs(upload_dir, exist_ok=True) # Create the directory (and parent dirs if needed) without throwing an error if it already exists
         # Copy file to upload dir
         filename = os.path.basename(file_path)# Extract just the filename from the full file path
         dest_path = os.path.join(upload_dir, filename)# Create the destination path inside the upload directory
-        shutil.copy(file_path, dest_path)# Copy the uploaded file to the destination directory
+        # Move the file into place instead of copying its bytes: a rename is a metadata-only change.
+        # Across filesystems let the kernel copy it with sendfile, and fall back to copyfile last
+        try:
+            os.replace(file_path, dest_path)
+        except OSError: # Source and uploads/ are on different filesystems
+            try:
+                self._sendfile_copy(file_path, dest_path)
+            except (OSError, AttributeError): # sendfile unsupported here (or no os.sendfile on this platform)
+                shutil.copyfile(file_path, dest_path) # Plain byte copy, skipping copy()'s extra chmod
         # Update DB with file path
-        conn = sqlite3.connect("user_learning.db")# Connect to the SQLite database
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE tasks SET submission_content = ? WHERE user_email = ? AND task_number = ?
-        """, (dest_path, user_email, task_number))# Update the task record with the path of the uploaded file
-        conn.commit()
-        conn.close()
+        with self._pool.acquire() as conn: # Single autocommit UPDATE on the pooled connection
+            conn.execute(SQL_UPDATE_TASK_FILE, (dest_path, user_email, task_number))# Update the task record with the path of the uploaded file
         return dest_path# Return the stored file path for confirmation
 
+    def _sendfile_copy(self, src_path: str, dest_path: str):
+        """Copy a file in the kernel with os.sendfile, without passing the bytes through Python"""
+        with open(src_path, "rb") as src, open(dest_path, "wb") as dst:
+            remaining = os.fstat(src.fileno()).st_size
+            offset = 0
+            while remaining > 0: # sendfile may copy less than asked for
+                sent = os.sendfile(dst.fileno(), src.fileno(), offset, remaining)
+                if sent == 0:
+                    break
+                offset += sent
+                remaining -= sent
+
     def get_task_file(self, user_email: str, task_number: int):# Method to fetch the saved file path for a given user's submitted task
         """Get the file path for a user's submitted task file."""
-        conn = sqlite3.connect("user_learning.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT submission_content FROM tasks WHERE user_email = ? AND task_number = ?
-        """, (user_email, task_number))# Retrieve the stored file path for the specified task
-        row = cursor.fetchone()# Fetch the first matching row
-        conn.close()# Close the database connection
+        with self._pool.acquire() as conn: # Borrow a connection from the shared pool
+            cursor = conn.cursor()
+            cursor.execute(SQL_SELECT_TASK_FILE, (user_email, task_number))# Retrieve the stored file path for the specified task
+            row = cursor.fetchone()# Fetch the first matching row
         if row and row[0]: # If a record is found and it has a file path, return it
             return row[0]
         return None# Otherwise, return None indicating no file was found
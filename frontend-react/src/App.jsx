@@ -31,6 +31,7 @@ export default function App() { // Define and export the main application compon
   // Quiz state
   const [quiz, setQuiz] = useState(null) // Track quiz data loaded from the server
   const [answers, setAnswers] = useState({}) // Track the user's answers for the quiz
+  const [quizMsg, setQuizMsg] = useState('') // Track any error shown on the quiz page (e.g. a rejected or busy submission)
 
   // Results state
   const [results, setResults] = useState(null)// Track quiz results returned from the server
@@ -104,6 +105,7 @@ export default function App() { // Define and export the main application compon
 
   // --- Browser history sync (enable back/forward arrows) ---
   const isPopNavigatingRef = React.useRef(false)
+  const requestInFlightRef = React.useRef(false) // Set while a quiz submit or task assignment is pending, so double clicks don't send it twice
 
   useEffect(() => { // Initialize current state in history
     const initial = { page }
@@ -343,12 +345,22 @@ export default function App() { // Define and export the main application compon
       setPage(PAGES.RESULTS)// Switch to results page immediately
       return
     }
-    setLoadingText('Submitting your quiz...')// Show loading message for quiz submission
-    setPage(PAGES.LOADING)// Switch to loading page
-    const effectiveName = auth?.name || userName// Determine effective name to send with submission
-    const data = await submitQuiz(effectiveName, answers)// Send answers to the API
-    setResults(data)// Store results returned by the API
-    setPage(PAGES.DURATION_INPUT)// Switch to duration input page instead of results
+    if (requestInFlightRef.current) return // A submission is already on its way
+    requestInFlightRef.current = true
+    try {
+      setQuizMsg('')// Clear any previous submission error
+      setLoadingText('Submitting your quiz...')// Show loading message for quiz submission
+      setPage(PAGES.LOADING)// Switch to loading page
+      const effectiveName = auth?.name || userName// Determine effective name to send with submission
+      const data = await submitQuiz(effectiveName, answers)// Send answers to the API
+      setResults(data)// Store results returned by the API
+      setPage(PAGES.DURATION_INPUT)// Switch to duration input page instead of results
+    } catch (e) { // Invalid answers (400) or a busy server (503): back to the quiz with the answers kept
+      setQuizMsg(`Quiz submission failed: ${e?.response?.data?.detail || e.message || 'Unknown error'}`)
+      setPage(PAGES.QUIZ)
+    } finally {
+      requestInFlightRef.current = false
+    }
   }
 
   // --- Roadmap rendering helpers ---
@@ -534,29 +546,38 @@ export default function App() { // Define and export the main application compon
       setTaskMessage('Please enter both name and email.')// Show error if name or email is missing
       return// Stop execution if validation fails
     }
-    setLoadingText('Assigning your task...')// Show loading message while assigning task
-    setPage(PAGES.LOADING)// Navigate to loading page
-    const result = await assignTask(taskUserName.trim(), taskEmail.trim(), durationWeeks)// Call backend to assign task using trimmed name and email
-    if (result.error) {// If the backend returned an error
-      setTaskMessage(`Task Assignment Error: ${result.message}`) // Show a detailed error message
-    } else {
-      const lines = [// Prepare a list of message lines to display to the user
-        `Learning journey started for ${taskUserName}!`, // Show assigned task number
-        '',// Blank line for spacing
-        `Task #${result.task_number} of ${durationWeeks * 2} assigned.`, // Show task progress
-        '',// Blank line for spacing
-        'Task Description:',  // Label for the task description section
-        result.task_description,  // Show the actual task description
-        '',// Blank line for spacing
-        `Due Date: ${result.due_date}`,  // Show task due date
-        '',// Blank line for spacing
-        `Your complete schedule includes ${durationWeeks * 2} tasks over ${durationWeeks} weeks.`, // Show schedule info
-        'Complete each task to unlock the next one in your learning journey.', // Show instructions
-        result.email_sent ? `An email has been sent to ${taskEmail}.` : 'Email delivery failed. Check email settings.',// Show whether an email was successfully sent
-      ]
-      setTaskMessage(lines.join('\n'))// Join all message lines into a single string separated by newlines
+    if (requestInFlightRef.current) return // An assignment is already on its way
+    requestInFlightRef.current = true
+    try {
+      setLoadingText('Assigning your task...')// Show loading message while assigning task
+      setPage(PAGES.LOADING)// Navigate to loading page
+      const result = await assignTask(taskUserName.trim(), taskEmail.trim(), durationWeeks)// Call backend to assign task using trimmed name and email
+      if (result.error) {// If the backend returned an error
+        setTaskMessage(`Task Assignment Error: ${result.message}`) // Show a detailed error message
+      } else {
+        const lines = [// Prepare a list of message lines to display to the user
+          `Learning journey started for ${taskUserName}!`, // Show assigned task number
+          '',// Blank line for spacing
+          `Task #${result.task_number} of ${durationWeeks * 2} assigned.`, // Show task progress
+          '',// Blank line for spacing
+          'Task Description:',  // Label for the task description section
+          result.task_description,  // Show the actual task description
+          '',// Blank line for spacing
+          `Due Date: ${result.due_date}`,  // Show task due date
+          '',// Blank line for spacing
+          `Your complete schedule includes ${durationWeeks * 2} tasks over ${durationWeeks} weeks.`, // Show schedule info
+          'Complete each task to unlock the next one in your learning journey.', // Show instructions
+          result.email_sent ? `An email to ${taskEmail} is being sent in the background.` : 'Email is not configured. Check email settings.',// email_sent means the email was queued; delivery happens after the response
+        ]
+        setTaskMessage(lines.join('\n'))// Join all message lines into a single string separated by newlines
+      }
+      setPage(PAGES.TASK_ASSIGN)// Return to the task assignment page with the result
+    } catch (e) { // No quiz result (404) or a busy server (503): back to the form with the reason
+      setTaskMessage(`Task Assignment Error: ${e?.response?.data?.detail || e.message || 'Unknown error'}`)
+      setPage(PAGES.TASK_ASSIGN)
+    } finally {
+      requestInFlightRef.current = false
     }
-    setPage(PAGES.TASK_ASSIGN)// Return to the task assignment page with the result
   }
 
   // Task display component for better formatting
@@ -823,6 +844,7 @@ export default function App() { // Define and export the main application compon
               </div>
             ))}
             <button className="btn primary" onClick={handleSubmitQuiz}>Submit Quiz</button>
+            {quizMsg && <div style={{ color: '#dc2626', marginTop: 8 }}>{quizMsg}</div>}
             
           </div>
         </div>